@@ -0,0 +1,47 @@
+############################################################################
+###  Simulation of a dispensary and the delivery of its prescriptions    ###
+############################################################################
+#The names below can be imported from the package directly, e.g.
+#  from dispensarySimulation import simulationRunner, defaultParameters
+#Their modules (and NumPy, SimPy, pandas, ...) are only imported when a name
+#is first used, so that importing the package itself is cheap.
+import importlib
+
+_modules = {'defaultParameters': 'parameters',
+            'optionalParameters': 'parameters',
+            'getUserInput': 'parameters',
+            'Dispensary': 'dispensary',
+            'ShiftCalendar': 'shiftCalendar',
+            'RandomStreams': 'randomStreams',
+            'MonitoringRecorder': 'recording',
+            'StreamingStatistics': 'streamingStatistics',
+            'simulationRunner': 'runner',
+            'lindleyEngine': 'fastEngine',
+            'confidenceInterval': 'confidence',
+            'runReplications': 'replications',
+            'runUntilPrecise': 'replications',
+            'compareScenarios': 'replications',
+            'replicationBreakdowns': 'analytics',
+            'parquetBreakdowns': 'analytics',
+            'breakdownTables': 'analytics',
+            'KpiServer': 'live',
+            'StopSimulation': 'live',
+            'optimiseStaffing': 'staffing',
+            'forkRuns': 'fork',
+            'networkRuns': 'network',
+            'scenarioGrid': 'scenarios',
+            'scenarioKey': 'scenarios',
+            'SweepStore': 'sweeps',
+            'runSweep': 'sweeps',
+            'writeParquet': 'columnarOutput',
+            'loadParquet': 'columnarOutput',
+            'ResultCache': 'cache',
+            'cachedSimulationRunner': 'cache'}
+
+__all__ = list(_modules)
+
+def __getattr__(name):
+    if name not in _modules:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module = importlib.import_module('.' + _modules[name], __name__)
+    return getattr(module, name)
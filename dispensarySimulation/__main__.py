@@ -0,0 +1,8 @@
+import sys
+
+from .cli import main
+
+#(the check keeps worker processes, which import this module as well, from
+#starting another run)
+if __name__ == '__main__':
+    sys.exit(main())
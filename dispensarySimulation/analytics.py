@@ -0,0 +1,286 @@
+import concurrent.futures
+import math
+import numpy
+
+from .replications import replicationRunner, summarise, summaryResults
+
+############################################################################
+###  Breakdowns by time of arrival and pick-up                           ###
+############################################################################
+#Waiting times per step, overall waiting, time in the dispensary and
+#throughput time, broken down by
+#- arrival: the hour of the week in which prescriptions arrived (e.g.
+#  Monday 10-11), and
+#- pickup: the pick-up which took them (e.g. Monday 12:00),
+#with count, mean, standard deviation and quantiles per group. Everything
+#is calculated from the typed arrays of the recorder (or columns read from
+#Parquet files), in one pass of NumPy operations per grouping; no data-frame
+#is built apart from the final table. Groups are summarised in a form that
+#can be merged (sums, sums of squares and histograms, see QuantileSketch),
+#so that breakdowns over thousands of replications are added up one
+#replication at a time, e.g.
+#  replicationBreakdowns(params, 1000, horizon = 672)['arrival']
+
+measures = ['waitingForVerif', 'waitingForLabel', 'waitingForDisp',
+            'waitingForFinCheck', 'waitingForTransp', 'overallWaiting',
+            'processInDisp', 'throughputTime']
+
+#(in the order of the weekday codes, as in Dispensary)
+namesOfWeekdays = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday',
+                   'Saturday', 'Sunday']
+
+#Columns needed (as recorded, see Dispensary):
+recordedColumns = ['arrivalTime', 'verifStarted', 'verifFinished',
+                   'labelStarted', 'labelFinished', 'dispStarted',
+                   'dispFinished', 'finCheckStarted', 'finCheckFinished',
+                   'putInStore', 'timeOfPickup', 'timeOfDelivery']
+
+#The measures from the recorded columns (NaN where not reached yet):
+def measureArrays(columns):
+    c = columns
+    values = {'waitingForVerif': c['verifStarted'] - c['arrivalTime'],
+              'waitingForLabel': c['labelStarted'] - c['verifFinished'],
+              'waitingForDisp': c['dispStarted'] - c['labelFinished'],
+              'waitingForFinCheck': c['finCheckStarted'] - c['dispFinished'],
+              'waitingForTransp': c['timeOfPickup'] - c['putInStore'],
+              'processInDisp': c['putInStore'] - c['arrivalTime'],
+              'throughputTime': c['timeOfDelivery'] - c['arrivalTime']}
+    values['overallWaiting'] = values['waitingForVerif'] + \
+                               values['waitingForLabel'] + \
+                               values['waitingForDisp'] + \
+                               values['waitingForFinCheck'] + \
+                               values['waitingForTransp']
+    return values
+
+#Count, sums, sums of squares and histograms of the measures per group
+#(identified by an integer key). The histograms have buckets whose bounds
+#grow geometrically, as in QuantileSketch, between minValue and maxValue
+#(values outside are counted in the first and last bucket).
+class GroupedStatistics(object):
+  def __init__(self, relativeAccuracy = 0.01, minValue = 1e-6,
+               maxValue = 1e5):
+    self.gamma = (1 + relativeAccuracy) / (1 - relativeAccuracy)
+    self.logGamma = math.log(self.gamma)
+    self.minValue = minValue
+    #bucket 0 is for values below minValue (e.g. waiting times of zero):
+    self.lowestBucket = math.ceil(math.log(minValue) / self.logGamma) - 1
+    self.buckets = math.ceil(math.log(maxValue) / self.logGamma) - \
+                   self.lowestBucket + 1
+    self.keys = numpy.zeros(0, dtype = numpy.int64)
+    self.rows = numpy.zeros(0, dtype = numpy.int64)
+    self.counts = {m: numpy.zeros(0, dtype = numpy.int64) for m in measures}
+    self.sums = {m: numpy.zeros(0) for m in measures}
+    self.sumsOfSquares = {m: numpy.zeros(0) for m in measures}
+    self.histograms = {m: numpy.zeros((0, self.buckets), dtype = numpy.int64)
+                       for m in measures}
+
+  #Pickled (e.g. to be sent back from a worker process) with only the
+  #nonzero buckets of the histograms, as positions and counts; most of the
+  #~1,300 buckets of a group are empty:
+  def __getstate__(self):
+      state = dict(self.__dict__)
+      state['histograms'] = {m: (numpy.flatnonzero(h), h[h != 0])
+                             for m, h in self.histograms.items()}
+      return state
+
+  def __setstate__(self, state):
+      self.__dict__.update(state)
+      for m, (positions, counts) in state['histograms'].items():
+          histogram = numpy.zeros(len(self.keys) * self.buckets,
+                                  dtype = numpy.int64)
+          histogram[positions] = counts
+          self.histograms[m] = histogram.reshape(len(self.keys), self.buckets)
+
+  #Making room for new keys (the arrays are kept sorted by key):
+  def addKeys(self, keys):
+      newKeys = numpy.union1d(self.keys, keys)
+      if len(newKeys) == len(self.keys):
+          return
+      old = numpy.searchsorted(newKeys, self.keys)
+      def grown(values):
+          result = numpy.zeros((len(newKeys),) + values.shape[1:],
+                               dtype = values.dtype)
+          result[old] = values
+          return result
+      self.rows = grown(self.rows)
+      for m in measures:
+          self.counts[m] = grown(self.counts[m])
+          self.sums[m] = grown(self.sums[m])
+          self.sumsOfSquares[m] = grown(self.sumsOfSquares[m])
+          self.histograms[m] = grown(self.histograms[m])
+      self.keys = newKeys
+
+  def bucketsOf(self, values):
+      with numpy.errstate(divide = 'ignore', invalid = 'ignore'):
+          buckets = numpy.ceil(numpy.log(values) / self.logGamma) - \
+                    self.lowestBucket
+      #(also negative values, e.g. rounding errors of the Lindley engine)
+      buckets[values < self.minValue] = 0
+      return numpy.clip(buckets, 0, self.buckets - 1).astype(numpy.int64)
+
+  #Adding rows, given the key of each row and the measures (arrays with
+  #one value per row, NaN where there is none):
+  def add(self, keys, values):
+      keys = numpy.asarray(keys, dtype = numpy.int64)
+      if len(keys) == 0:
+          return
+      self.addKeys(numpy.unique(keys))
+      k = len(self.keys)
+      groups = numpy.searchsorted(self.keys, keys)
+      self.rows += numpy.bincount(groups, minlength = k)
+      for m in measures:
+          v = values[m]
+          valid = ~numpy.isnan(v)
+          g = groups[valid]
+          v = v[valid]
+          self.counts[m] += numpy.bincount(g, minlength = k)
+          self.sums[m] += numpy.bincount(g, weights = v, minlength = k)
+          self.sumsOfSquares[m] += numpy.bincount(g, weights = v * v,
+                                                  minlength = k)
+          self.histograms[m] += numpy.bincount(
+                                  g * self.buckets + self.bucketsOf(v),
+                                  minlength = k * self.buckets).reshape(
+                                    k, self.buckets)
+
+  def merge(self, other):
+      self.addKeys(other.keys)
+      groups = numpy.searchsorted(self.keys, other.keys)
+      self.rows[groups] += other.rows
+      for m in measures:
+          self.counts[m][groups] += other.counts[m]
+          self.sums[m][groups] += other.sums[m]
+          self.sumsOfSquares[m][groups] += other.sumsOfSquares[m]
+          self.histograms[m][groups] += other.histograms[m]
+
+  #Quantile q of a measure in every group (the middle of the bucket, in
+  #terms of relative error, as in QuantileSketch):
+  def quantiles(self, m, q):
+      cumulative = numpy.cumsum(self.histograms[m], axis = 1)
+      n = cumulative[:, -1] if len(cumulative) else numpy.zeros(0)
+      ranks = q * (n - 1)
+      buckets = numpy.argmax(cumulative > ranks[:, None], axis = 1)
+      values = 2 * self.gamma**(buckets + self.lowestBucket) / \
+               (self.gamma + 1)
+      values[buckets == 0] = 0.0
+      values[n == 0] = numpy.nan
+      return values
+
+  #A table with one row per group: number of prescriptions, and count,
+  #mean, standard deviation and quantiles of each measure:
+  def table(self, quantiles = (0.5, 0.9, 0.95)):
+      import pandas
+      data = {'prescriptions': self.rows}
+      with numpy.errstate(invalid = 'ignore', divide = 'ignore'):
+          for m in measures:
+              n = self.counts[m]
+              mean = self.sums[m] / n
+              variance = (self.sumsOfSquares[m] - n * mean**2) / (n - 1)
+              data[m + 'Count'] = n
+              data[m + 'Mean'] = mean
+              data[m + 'Std'] = numpy.sqrt(numpy.maximum(variance, 0))
+              for q in quantiles:
+                  data[f'{m}P{round(q * 100)}'] = self.quantiles(m, q)
+      return pandas.DataFrame(data, index = self.keys)
+
+#Keys of the groupings: the hour of the week of the arrival (Monday 0-1
+#being 0), and the minute of the week of the pick-up:
+def groupingKeys(columns):
+    return {'arrival': numpy.floor(columns['arrivalTime'] % 168),
+            'pickup': numpy.round(columns['timeOfPickup'] % 168 * 60)}
+
+#Adding rows (given as recorded columns) to the statistics of both
+#groupings (prescriptions not picked up are not in any pick-up group):
+def addRows(statistics, columns):
+    values = measureArrays(columns)
+    keys = groupingKeys(columns)
+    statistics['arrival'].add(keys['arrival'], values)
+    pickedUp = ~numpy.isnan(keys['pickup'])
+    statistics['pickup'].add(keys['pickup'][pickedUp],
+                             {m: v[pickedUp] for m, v in values.items()})
+    return statistics
+
+def newStatistics():
+    return {'arrival': GroupedStatistics(), 'pickup': GroupedStatistics()}
+
+#Breakdowns of a run from the arrays of its recorder (rows of
+#prescriptions that have arrived):
+def runBreakdowns(recorder):
+    columns = {c: recorder.arrays[c][:recorder.size] for c in recordedColumns}
+    arrived = ~numpy.isnan(columns['arrivalTime'])
+    return addRows(newStatistics(), {c: values[arrived]
+                                     for c, values in columns.items()})
+
+#The tables of the groupings, labelled by weekday and time of day:
+def breakdownTables(statistics, quantiles = (0.5, 0.9, 0.95)):
+    names = numpy.array(namesOfWeekdays)
+    arrival = statistics['arrival'].table(quantiles)
+    arrival.insert(0, 'dayOfWeekOfArrival', names[arrival.index // 24])
+    arrival.insert(1, 'hourOfArrival', arrival.index % 24)
+    pickup = statistics['pickup'].table(quantiles)
+    pickup.insert(0, 'dayOfWeekOfPickup', names[pickup.index // 1440])
+    pickup.insert(1, 'timeOfDayOfPickup', pickup.index % 1440 / 60)
+    return {'arrival': arrival.reset_index(drop = True),
+            'pickup': pickup.reset_index(drop = True)}
+
+#Running n replications (as runReplications, but always keeping the rows)
+#and adding up their breakdowns as the replications come in, so that only
+#one replication's breakdowns are held at a time. Returns the results of
+#the replications, their summary and the tables of both groupings.
+def replicationBreakdowns(params, n, seeds = None, workers = None,
+                          confidence = 0.95, quantiles = (0.5, 0.9, 0.95),
+                          **runOptions):
+    if seeds is None:
+        seeds = numpy.random.SeedSequence(params.get('seed')).spawn(n)
+    parametersPerReplication = [dict(params, seed = seed) for seed in seeds]
+    optionsPerReplication = [dict(runOptions, keepRows = True,
+                                  breakdowns = 'statistics',
+                                  replication = r)
+                             for r in range(len(seeds))]
+    statistics = newStatistics()
+    replications = []
+    if workers == 1:
+        executor = None
+        results = map(replicationRunner, parametersPerReplication,
+                      optionsPerReplication)
+    else:
+        executor = concurrent.futures.ProcessPoolExecutor(workers)
+        results = executor.map(replicationRunner, parametersPerReplication,
+                               optionsPerReplication)
+    try:
+        for result in results:
+            for name, grouped in result.pop('breakdowns').items():
+                statistics[name].merge(grouped)
+            replications.append(result)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    return dict({'replications': replications,
+                 'summary': summarise(replications, summaryResults,
+                                      confidence)},
+                **breakdownTables(statistics, quantiles))
+
+#Breakdowns of the monitoring data written as Parquet files (see
+#columnarOutput.py), over all (or the given) scenarios and replications
+#together, read in batches of rows rather than as one data-frame:
+def parquetBreakdowns(root, scenarios = None, replications = None,
+                      quantiles = (0.5, 0.9, 0.95)):
+    import pathlib
+    import pyarrow.dataset
+    dataset = pyarrow.dataset.dataset(pathlib.Path(root, 'monitoring'),
+                                      format = 'parquet',
+                                      partitioning = 'hive')
+    condition = None
+    if scenarios is not None:
+        condition = pyarrow.dataset.field('scenario').isin(list(scenarios))
+    if replications is not None:
+        inReplications = pyarrow.dataset.field('replication').isin(
+                           list(replications))
+        condition = inReplications if condition is None \
+                    else condition & inReplications
+    statistics = newStatistics()
+    for batch in dataset.to_batches(columns = recordedColumns,
+                                    filter = condition):
+        addRows(statistics, {c: batch.column(c).to_numpy(
+                                  zero_copy_only = False).astype(float)
+                             for c in recordedColumns})
+    return breakdownTables(statistics, quantiles)
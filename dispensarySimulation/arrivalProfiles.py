@@ -0,0 +1,74 @@
+import numpy
+
+############################################################################
+###  Arrival profiles                                                    ###
+############################################################################
+#Demand that changes over the week, e.g. peaking after morning ward rounds,
+#given as the mean number of prescriptions per hour for each of the 168
+#hours of the week (Monday 0-1 is hour 0, Sunday 23-24 is hour 167), as
+#parameter arrivalProfile (see optionalParameters; interarrivTime is then
+#not used). Arrivals are still only generated during opening hours, as a
+#Poisson process whose rate is that of the hour (a non-homogeneous one).
+#They are drawn for a whole shift at once, by inversion: with the expected
+#number of arrivals from the start of the week, Lambda(t), which grows
+#linearly within each hour (precomputed at the start of each hour), the
+#arrival times are Lambda^-1 of the partial sums of standard exponential
+#numbers, i.e. no arrivals are drawn and then thinned out.
+
+class ArrivalProfile(object):
+  def __init__(self, rates):
+    self.rates = numpy.asarray(rates, dtype = float)
+    if self.rates.shape != (168,) or numpy.any(self.rates < 0):
+        raise ValueError('An arrival profile needs 168 rates (one for each '
+                         'hour of the week), none of them negative')
+    #Lambda at the start of each hour of the week (and at the end of the
+    #week):
+    self.cumulative = numpy.concatenate(([0.0], numpy.cumsum(self.rates)))
+    self.perWeek = self.cumulative[-1]
+
+  #Expected number of arrivals from the start of the run until time t:
+  def expectedArrivals(self, t):
+      weeks, hours = divmod(t, 168)
+      hour = int(hours)
+      return weeks * self.perWeek + self.cumulative[hour] + \
+             (hours - hour) * self.rates[hour]
+
+  #Mean rate over the opening hours of a week (given by a ShiftCalendar),
+  #the only hours in which prescriptions arrive:
+  def meanRateWhenOpen(self, calendar):
+      arrivals = sum(self.expectedArrivals(end) - self.expectedArrivals(start)
+                     for start, end in zip(calendar.shiftStarts,
+                                           calendar.shiftEnds))
+      return arrivals / calendar.openHoursPerWeek
+  
+  #Times at which the expected numbers of arrivals y are reached (Lambda^-1):
+  def timesOfExpectedArrivals(self, y):
+      weeks, remainder = numpy.divmod(y, self.perWeek)
+      #(hours with a rate of 0 are skipped, as Lambda does not grow in them)
+      hours = numpy.searchsorted(self.cumulative, remainder,
+                                 side = 'right') - 1
+      hours = numpy.minimum(hours, 167)
+      rates = self.rates[hours]
+      offsets = numpy.divide(remainder - self.cumulative[hours], rates,
+                             out = numpy.zeros(len(y)), where = rates > 0)
+      return weeks * 168 + hours + offsets
+
+  #Arrival times from start until end (inclusive), with the standard
+  #exponential numbers of stream (see RandomStreams) drawn in blocks:
+  def arrivalsBetween(self, start, end, stream):
+      if self.perWeek == 0:
+          return numpy.zeros(0)
+      y = self.expectedArrivals(start)
+      yEnd = self.expectedArrivals(end)
+      blocks = []
+      while y <= yEnd:
+          expected = yEnd - y
+          partialSums = y + numpy.cumsum(stream.draw(
+                          int(expected + 4 * numpy.sqrt(expected)) + 16))
+          blocks.append(partialSums[partialSums <= yEnd])
+          y = partialSums[-1]
+      if not blocks:
+          return numpy.zeros(0)
+      #(clipped against rounding errors)
+      return numpy.clip(self.timesOfExpectedArrivals(
+                          numpy.concatenate(blocks)), start, end)
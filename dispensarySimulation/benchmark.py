@@ -0,0 +1,201 @@
+import argparse
+import concurrent.futures
+import itertools
+import json
+import platform
+import resource
+import sys
+import time
+
+from .parameters import defaultParameters
+
+############################################################################
+###  Benchmarks                                                          ###
+############################################################################
+#Timing simulationRunner over a matrix of interarrival times, staffing
+#levels (the same number of staff at each of the four steps) and horizons,
+#e.g. before and after a change to the processes or the recording path:
+#  python -m dispensarySimulation.benchmark --output new.json
+#  python -m dispensarySimulation.benchmark --baseline old.json
+#Each case runs in a fresh worker process (one at a time, so that runs do
+#not compete for the CPU), with a fixed seed, so that every run of a case
+#simulates exactly the same events. Per case, the best of a few repeats is
+#reported:
+#- wallTimePerWeek: wall time (in seconds) per simulated week,
+#- eventsPerSecond: SimPy events processed per second of wall time (counted
+#  in a separate, untimed run),
+#- recordingCost: extra wall time per prescription (in microseconds) of a
+#  run keeping the monitoring rows over one keeping streaming statistics
+#  only (i.e. recording plus building the data-frame),
+#- peakRss: peak resident memory (in MB) of the worker process.
+
+defaultMatrix = {'engine': ['simpy'],
+                 'interarrivTime': [5/60, 2/60],
+                 'staff': [3, 6],
+                 'horizon': [168, 672]}
+
+#Metrics for which larger values are worse (used to flag regressions):
+costMetrics = ['wallTimePerWeek', 'recordingCost', 'peakRss']
+
+#A SimPy environment counting the events it processes (slower than a plain
+#one, so it is not used for timing):
+def countingEnvironment():
+    import simpy
+
+    class CountingEnvironment(simpy.Environment):
+      def __init__(self):
+        super().__init__()
+        self.eventsProcessed = 0
+
+      def step(self):
+          self.eventsProcessed += 1
+          return super().step()
+
+    return CountingEnvironment()
+
+def caseId(case):
+    return (f"{case['engine']}-interarrivTime={case['interarrivTime']:.4g}"
+            f"-staff={case['staff']}-horizon={case['horizon']:g}")
+
+def caseParameters(case, seed):
+    parameters = dict(defaultParameters,
+                      interarrivTime = case['interarrivTime'], seed = seed)
+    for name in ['numPharmacists', 'numLabellers', 'numDispensers',
+                 'numFinCheckers']:
+        parameters[name] = case['staff']
+    return parameters
+
+#Best wall time of a few runs, together with the results of the last run:
+def timedRuns(case, seed, repeats, keepRows):
+    from .runner import simulationRunner
+    bestTime = float('inf')
+    for repeat in range(repeats):
+        started = time.perf_counter()
+        results = simulationRunner(caseParameters(case, seed),
+                                   outputPath = None, engine = case['engine'],
+                                   keepRows = keepRows,
+                                   horizon = case['horizon'])
+        bestTime = min(bestTime, time.perf_counter() - started)
+    return bestTime, results
+
+#Measuring one case (in a fresh worker process):
+def benchmarkCase(case, seed = 1, repeats = 3):
+    from .runner import simulationRunner
+    events = None
+    if case['engine'] == 'simpy':
+        env = countingEnvironment()
+        simulationRunner(caseParameters(case, seed), outputPath = None,
+                         keepRows = False, horizon = case['horizon'],
+                         env = env)
+        events = env.eventsProcessed
+    statsTime, results = timedRuns(case, seed, repeats, keepRows = False)
+    rowsTime, results = timedRuns(case, seed, repeats, keepRows = True)
+    prescriptions = results['totalWorkItems']
+    #ru_maxrss is given in kB on Linux, but in bytes on macOS:
+    peakRss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peakRss /= 2**20 if sys.platform == 'darwin' else 2**10
+    return dict(case,
+                id = caseId(case),
+                wallTime = rowsTime,
+                wallTimePerWeek = rowsTime / (case['horizon'] / 168),
+                wallTimeWithoutRows = statsTime,
+                events = events,
+                eventsPerSecond = None if events is None else events / rowsTime,
+                prescriptions = prescriptions,
+                recordingCost = 1e6 * (rowsTime - statsTime)
+                                / max(prescriptions, 1),
+                peakRss = peakRss)
+
+#Running all cases of the matrix (every combination of its values):
+def runBenchmarks(matrix = defaultMatrix, seed = 1, repeats = 3):
+    import numpy
+    import pandas
+    import simpy
+    names = list(matrix)
+    cases = [dict(zip(names, values))
+             for values in itertools.product(*matrix.values())]
+    results = []
+    for case in cases:
+        #one worker process per case, so that peakRss is that of the case:
+        with concurrent.futures.ProcessPoolExecutor(
+               1, max_tasks_per_child = 1) as executor:
+            results.append(executor.submit(benchmarkCase, case, seed,
+                                           repeats).result())
+        print(f"{results[-1]['id']}: "
+              f"{results[-1]['wallTimePerWeek']:.3f} s per week",
+              file = sys.stderr)
+    return {'environment': {'python': platform.python_version(),
+                            'simpy': simpy.__version__,
+                            'numpy': numpy.__version__,
+                            'pandas': pandas.__version__,
+                            'machine': platform.machine(),
+                            'platform': platform.platform()},
+            'seed': seed,
+            'repeats': repeats,
+            'cases': results}
+
+#Comparing benchmark results with a baseline (cases are matched by their
+#ID): a metric more than threshold (relative) worse than in the baseline is
+#flagged as a regression.
+def compareToBaseline(benchmarks, baseline, threshold = 0.1):
+    baselineCases = {case['id']: case for case in baseline['cases']}
+    comparison = []
+    for case in benchmarks['cases']:
+        if case['id'] not in baselineCases:
+            continue
+        for metric in costMetrics:
+            old = baselineCases[case['id']][metric]
+            new = case[metric]
+            if old is None or new is None or old <= 0:
+                continue
+            change = new / old - 1
+            comparison.append({'id': case['id'],
+                               'metric': metric,
+                               'baseline': old,
+                               'value': new,
+                               'change': change,
+                               'regression': change > threshold})
+    return comparison
+
+def main(arguments = None):
+    parser = argparse.ArgumentParser(
+               prog = 'python -m dispensarySimulation.benchmark',
+               description = 'Timing simulation runs over a matrix of '
+                             'interarrival times, staffing and horizons.')
+    parser.add_argument('--output', default = 'benchmarks.json',
+                        help = 'JSON file to write the results to')
+    parser.add_argument('--baseline',
+                        help = 'JSON file with earlier results to compare to')
+    parser.add_argument('--threshold', type = float, default = 0.1,
+                        help = 'relative change flagged as a regression '
+                               '(default: 0.1)')
+    parser.add_argument('--repeats', type = int, default = 3)
+    parser.add_argument('--seed', type = int, default = 1)
+    parser.add_argument('--engine', nargs = '+',
+                        default = defaultMatrix['engine'],
+                        choices = ['simpy', 'lindley'])
+    parser.add_argument('--interarrivTime', nargs = '+', type = float,
+                        default = defaultMatrix['interarrivTime'])
+    parser.add_argument('--staff', nargs = '+', type = int,
+                        default = defaultMatrix['staff'])
+    parser.add_argument('--horizon', nargs = '+', type = float,
+                        default = defaultMatrix['horizon'])
+    args = parser.parse_args(arguments)
+    matrix = {name: getattr(args, name) for name in defaultMatrix}
+    benchmarks = runBenchmarks(matrix, args.seed, args.repeats)
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        benchmarks['comparison'] = compareToBaseline(benchmarks, baseline,
+                                                     args.threshold)
+    with open(args.output, 'w') as file:
+        json.dump(benchmarks, file, indent = 2)
+    regressions = [c for c in benchmarks.get('comparison', [])
+                   if c['regression']]
+    for c in regressions:
+        print(f"REGRESSION {c['id']} {c['metric']}: {c['baseline']:.4g} -> "
+              f"{c['value']:.4g} ({c['change']:+.1%})", file = sys.stderr)
+    return 1 if regressions else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,176 @@
+import hashlib
+import json
+import pathlib
+import shutil
+import sqlite3
+import time
+
+from .runner import simulationRunner, parameterNames
+from .scenarios import jsonDefault
+
+############################################################################
+###  Cache of results                                                    ###
+############################################################################
+#Results of simulation runs kept on disk, so that running the same
+#parameters (including the seed) with the same options again returns the
+#stored results at once, e.g. in a notebook:
+#  cache = ResultCache('simulationCache')
+#  results = cachedSimulationRunner(params, cache, horizon = 672)
+#The key of a run is a hash of its parameters (the names in
+#defaultParameters and optionalParameters, the seed and the antithetic
+#flag; not any results added to the dictionary), its options and the version
+#of the model (a hash of the source code of this package and the versions
+#of SimPy and NumPy), so a changed model never returns old results. The
+#monitoring data-frames can be kept as well (as Parquet files, see
+#columnarOutput.py). When the cache grows beyond maxBytes, the entries used
+#least recently are removed. An SQLite index of the entries (as for
+#SweepStore) allows several processes to share one cache.
+
+modelVersionHash = None
+
+def modelVersion():
+    global modelVersionHash
+    if modelVersionHash is None:
+        import numpy
+        import simpy
+        digest = hashlib.sha256()
+        for path in sorted(pathlib.Path(__file__).parent.glob('*.py')):
+            digest.update(path.name.encode())
+            digest.update(path.read_bytes())
+        digest.update(f'simpy {simpy.__version__}'.encode())
+        digest.update(f'numpy {numpy.__version__}'.encode())
+        modelVersionHash = digest.hexdigest()[:16]
+    return modelVersionHash
+
+def runKey(parametersByUser, runOptions):
+    content = json.dumps({'parameters': parametersByUser,
+                          'options': runOptions,
+                          'model': modelVersion()},
+                         sort_keys = True, default = jsonDefault)
+    return hashlib.sha256(content.encode()).hexdigest()
+
+class ResultCache(object):
+  def __init__(self, directory, maxBytes = 2**30):
+    self.directory = pathlib.Path(directory)
+    self.directory.mkdir(parents = True, exist_ok = True)
+    self.maxBytes = maxBytes
+    self.connection = sqlite3.connect(self.directory / 'index.sqlite')
+    self.connection.execute('PRAGMA journal_mode = WAL')
+    self.connection.execute('''
+      CREATE TABLE IF NOT EXISTS entries (
+        key TEXT PRIMARY KEY,
+        bytes INTEGER,
+        tables INTEGER,
+        lastUsed REAL)''')
+    self.connection.commit()
+
+  def close(self):
+      self.connection.close()
+
+  def entryPath(self, key):
+      return self.directory / key[:2] / key
+
+  #The stored results (and the directory of the stored tables, if there
+  #are any), or None if the run is not in the cache (with tables, if
+  #tables are asked for):
+  def get(self, key, tables = False):
+      row = self.connection.execute('SELECT tables FROM entries '
+                                    'WHERE key = ?', (key,)).fetchone()
+      if row is None or (tables and not row[0]):
+          return None
+      path = self.entryPath(key)
+      try:
+          results = json.loads((path / 'results.json').read_text())
+      except FileNotFoundError:
+          self.remove(key)
+          return None
+      self.connection.execute('UPDATE entries SET lastUsed = ? WHERE key = ?',
+                              (time.time(), key))
+      self.connection.commit()
+      return results, (path if row[0] else None)
+
+  #Directory for the files of an entry (written before calling put):
+  def newEntry(self, key):
+      path = self.entryPath(key)
+      shutil.rmtree(path, ignore_errors = True)
+      path.mkdir(parents = True)
+      return path
+
+  def put(self, key, results, tables = False):
+      path = self.entryPath(key)
+      (path / 'results.json').write_text(json.dumps(results,
+                                                    default = jsonDefault))
+      size = sum(file.stat().st_size for file in path.rglob('*')
+                 if file.is_file())
+      self.connection.execute(
+        'INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)',
+        (key, size, int(tables), time.time()))
+      self.connection.commit()
+      self.evict(keep = key)
+
+  def remove(self, key):
+      shutil.rmtree(self.entryPath(key), ignore_errors = True)
+      self.connection.execute('DELETE FROM entries WHERE key = ?', (key,))
+      self.connection.commit()
+
+  #Removing the entries used least recently until the cache fits into
+  #maxBytes again (apart from the entry keep, e.g. the one just written):
+  def evict(self, keep = None):
+      total = self.connection.execute(
+                'SELECT COALESCE(SUM(bytes), 0) FROM entries').fetchone()[0]
+      if total <= self.maxBytes:
+          return
+      rows = self.connection.execute('SELECT key, bytes FROM entries '
+                                     'WHERE key IS NOT ? ORDER BY lastUsed',
+                                     (keep,)).fetchall()
+      for key, size in rows:
+          if total <= self.maxBytes:
+              break
+          self.remove(key)
+          total -= size
+
+  def clear(self):
+      for (key,) in self.connection.execute(
+                      'SELECT key FROM entries').fetchall():
+          self.remove(key)
+
+#simulationRunner in front of a cache: returns the stored results, if the
+#same run has been made before, otherwise runs the simulation and stores
+#its results. With tables = True, the monitoring data-frames are returned
+#as well, as a dictionary {'monitoring': ..., 'pickups': ...} (read from
+#Parquet files, which needs pyarrow). Runs without a seed are random, so
+#they are not cached. As simulationRunner does, the results are added to
+#parametersByUser.
+def cachedSimulationRunner(parametersByUser, cache, tables = False,
+                           engine = 'simpy', keepRows = True, horizon = 168,
+                           steadyState = False):
+    from .columnarOutput import loadParquet
+    runOptions = {'engine': engine, 'keepRows': keepRows or tables,
+                  'horizon': horizon, 'steadyState': steadyState}
+    if parametersByUser.get('seed') is None:
+        if tables:
+            raise ValueError('tables are only cached for runs with a seed')
+        return simulationRunner(parametersByUser, outputPath = None,
+                                **runOptions)
+    #(parametersByUser may already hold the results of an earlier run)
+    parameters = {name: value for name, value in parametersByUser.items()
+                  if name in parameterNames or name in ['seed', 'antithetic']}
+    key = runKey(parameters, runOptions)
+    entry = cache.get(key, tables)
+    if entry is None:
+        #only the results are stored, not the parameters (which are part of
+        #the key anyway):
+        path = cache.newEntry(key)
+        results = simulationRunner(dict(parameters), outputPath = None,
+                                   parquetRoot = path if tables else None,
+                                   replication = 0, **runOptions)
+        entry = ({name: value for name, value in results.items()
+                  if name not in parameters}, path if tables else None)
+        cache.put(key, entry[0], tables)
+    parametersByUser.update(entry[0])
+    results = parametersByUser
+    if not tables:
+        return results
+    return results, {table: loadParquet(entry[1], table).drop(
+                                columns = ['scenario', 'replication'])
+                     for table in ['monitoring', 'pickups']}
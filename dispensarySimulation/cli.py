@@ -0,0 +1,227 @@
+import argparse
+import json
+import sys
+import time
+
+from .parameters import defaultParameters, optionalParameters, getUserInput
+from .parameters import parseNumber
+
+############################################################################
+###  Command line                                                        ###
+############################################################################
+#Running simulations without any prompts, e.g.
+#  python -m dispensarySimulation --numPharmacists 3 --weekdayPickup 10,15
+#  python -m dispensarySimulation --config scenario.toml --replications 20
+#  python -m dispensarySimulation --precision meanThroughput=0.1
+#The results are printed as JSON. A configuration file (.json or .toml) holds
+#parameters at its top level and, optionally, options of the run in a 'run'
+#table (e.g. engine, horizon, replications, workers). Anything given on the
+#command line takes precedence over the configuration file. Only the
+#standard library is imported until the simulation starts.
+
+#Options passed on to simulationRunner (or runReplications):
+runOptionNames = ['engine', 'horizon', 'keepRows', 'steadyState',
+                  'parquetRoot', 'instrument', 'profilePath', 'trace']
+#Options of the command line itself:
+cliOptionNames = ['replications', 'workers', 'csv', 'precision',
+                  'maxReplications', 'antithetic', 'live', 'liveInterval',
+                  'replication']
+
+#Reading a target precision such as 'meanThroughput=0.1':
+def parsePrecision(text):
+    result, separator, halfWidth = text.partition('=')
+    if not separator:
+        raise argparse.ArgumentTypeError(f"expected RESULT=HALFWIDTH, not "
+                                         f"'{text}'")
+    return result.strip(), float(halfWidth)
+
+#Reading a number of hours that must be positive (e.g. '12'):
+def parsePositive(text):
+    value = float(text)
+    if not value > 0:
+        raise argparse.ArgumentTypeError(f"expected a positive number, not "
+                                         f"'{text}'")
+    return value
+
+#Reading pick-up times such as '10,12,15,17' or '10 12.5':
+def parseTimes(text):
+    return [parseNumber(t) for t in text.replace(',', ' ').split()]
+
+def readConfig(path):
+    if path.endswith('.toml'):
+        import tomllib
+        with open(path, 'rb') as file:
+            return tomllib.load(file)
+    with open(path) as file:
+        return json.load(file)
+
+def argumentParser():
+    parser = argparse.ArgumentParser(
+               prog = 'python -m dispensarySimulation',
+               description = 'Simulating a dispensary and the delivery of '
+                             'its prescriptions; prints the results as JSON.')
+    parser.add_argument('--config',
+                        help = 'JSON or TOML file with parameters (and a '
+                               "'run' table of options)")
+    parser.add_argument('--interactive', action = 'store_true',
+                        help = 'ask for the parameters (as the original '
+                               'script did)')
+    parser.add_argument('--timing', action = 'store_true',
+                        help = 'print start-up and run times to stderr')
+    parameters = parser.add_argument_group('parameters')
+    for name, default in dict(defaultParameters,
+                              **optionalParameters).items():
+        if isinstance(default, list) or name == 'arrivalProfile':
+            parseValue = parseTimes
+        elif name.startswith('num'):
+            parseValue = int
+        else:
+            parseValue = parseNumber
+        parameters.add_argument('--' + name, type = parseValue,
+                                help = f'default: {default}')
+    parameters.add_argument('--seed', type = int,
+                            help = 'seed of the random numbers (default: '
+                                   'fresh entropy for every run)')
+    run = parser.add_argument_group('run')
+    run.add_argument('--engine', choices = ['simpy', 'lindley'])
+    run.add_argument('--horizon', type = float,
+                     help = 'simulated hours (default: 168, i.e. one week)')
+    run.add_argument('--no-rows', dest = 'keepRows', action = 'store_false',
+                     default = None,
+                     help = 'keep streaming statistics only (constant memory)')
+    run.add_argument('--steady-state', dest = 'steadyState',
+                     action = 'store_true', default = None,
+                     help = 'detect the warm-up period and add batch means')
+    run.add_argument('--parquet-root', dest = 'parquetRoot',
+                     help = 'directory to write the monitoring data to '
+                            '(as Parquet files)')
+    run.add_argument('--replication', type = int,
+                     help = 'number of a single run in --parquet-root (its '
+                            'partition; replications are numbered anyway)')
+    run.add_argument('--trace',
+                     help = 'replay the arrivals of this .csv or .npy file '
+                            '(see traces.py)')
+    run.add_argument('--instrument', action = 'store_true', default = None,
+                     help = 'add a report on where the time of the run goes')
+    run.add_argument('--profile', dest = 'profilePath',
+                     help = 'profile the run with cProfile and dump the '
+                            'statistics to this file')
+    run.add_argument('--replications', type = int,
+                     help = 'number of replications (run in parallel)')
+    run.add_argument('--antithetic', action = 'store_true', default = None,
+                     help = 'add an antithetic run to each replication '
+                            '(with --replications)')
+    run.add_argument('--precision', type = parsePrecision, action = 'append',
+                     metavar = 'RESULT=HALFWIDTH',
+                     help = 'run replications until the confidence interval '
+                            'of the result is this narrow (may be repeated)')
+    run.add_argument('--max-replications', dest = 'maxReplications',
+                     type = int,
+                     help = 'most replications run for --precision '
+                            '(default: 200)')
+    run.add_argument('--workers', type = int,
+                     help = 'number of worker processes for replications')
+    run.add_argument('--live', type = int, metavar = 'PORT',
+                     help = 'publish rolling KPIs of a single run on this '
+                            'local port (see live.py)')
+    run.add_argument('--live-interval', dest = 'liveInterval',
+                     type = parsePositive,
+                     help = 'simulated hours between KPIs for --live '
+                            '(default: 24)')
+    run.add_argument('--csv',
+                     help = 'save the monitoring data-frame of a single run '
+                            'to this .csv file')
+    return parser
+
+def main(arguments = None):
+    started = time.perf_counter()
+    parser = argumentParser()
+    args = parser.parse_args(arguments)
+    config = readConfig(args.config) if args.config else {}
+    runConfig = config.pop('run', {})
+    parameterNames = list(defaultParameters) + list(optionalParameters)
+    unknown = set(config) - set(parameterNames) - {'seed'}
+    unknown |= set(runConfig) - set(runOptionNames) - set(cliOptionNames)
+    if unknown:
+        parser.error(f"unknown entries in {args.config}: {sorted(unknown)}")
+
+    parameters = getUserInput() if args.interactive \
+                 else dict(defaultParameters)
+    parameters.update(config)
+    options = dict(runConfig)
+    for name in parameterNames + ['seed']:
+        if getattr(args, name) is not None:
+            parameters[name] = getattr(args, name)
+    for name in runOptionNames + cliOptionNames:
+        if getattr(args, name) is not None:
+            options[name] = getattr(args, name)
+    replications = options.pop('replications', None)
+    workers = options.pop('workers', None)
+    csvPath = options.pop('csv', None)
+    precision = dict(options.pop('precision', None) or {})
+    maxReplications = options.pop('maxReplications', 200)
+    antithetic = options.pop('antithetic', False)
+    livePort = options.pop('live', None)
+    liveInterval = options.pop('liveInterval', 24)
+    replication = options.pop('replication', None)
+    if options.get('profilePath') is not None and \
+       (precision or replications):
+        parser.error('--profile is for single runs (replications would '
+                     'overwrite each other\'s profile)')
+    if antithetic and (precision or not replications):
+        parser.error('--antithetic needs --replications (it is not '
+                     'supported with --precision or for single runs)')
+    if livePort is not None and (precision or replications):
+        parser.error('--live is for single runs, not with --replications '
+                     'or --precision')
+    if livePort is not None and options.get('engine') == 'lindley':
+        parser.error('--live needs the SimPy engine (the Lindley engine '
+                     'does not call observers)')
+    if csvPath is not None and (precision or replications):
+        parser.error('--csv is for single runs (replications keep no '
+                     'monitoring data-frame; use --parquet-root)')
+    if not liveInterval > 0:
+        parser.error('the live interval must be a positive number of hours')
+    if replication is not None and (precision or replications):
+        parser.error('--replication is for single runs (replications are '
+                     'numbered anyway)')
+    if options.get('parquetRoot') is not None and replication is None and \
+       not (precision or replications):
+        parser.error('--parquet-root needs --replication for a single run '
+                     '(so that runs do not overwrite each other)')
+
+    simulationStarted = time.perf_counter()
+    if precision:
+        from .replications import runUntilPrecise
+        output = runUntilPrecise(parameters, precision,
+                                 maxReplications = maxReplications,
+                                 workers = workers, **options)
+    elif replications:
+        from .replications import runReplications
+        output = runReplications(parameters, replications, workers = workers,
+                                 antithetic = antithetic, **options)
+    elif livePort is not None:
+        from .live import KpiServer
+        from .runner import simulationRunner
+        server = KpiServer(port = livePort)
+        print(f'KPIs: http://{server.host}:{server.port}/events (stop: '
+              f'http://{server.host}:{server.port}/stop)', file = sys.stderr)
+        try:
+            output = simulationRunner(parameters, outputPath = csvPath,
+                                      replication = replication,
+                                      observer = server.observer,
+                                      observeInterval = liveInterval,
+                                      **options)
+        finally:
+            server.close()
+    else:
+        from .runner import simulationRunner
+        output = simulationRunner(parameters, outputPath = csvPath,
+                                  replication = replication, **options)
+    from .scenarios import jsonDefault
+    print(json.dumps(output, default = jsonDefault, indent = 2))
+    if args.timing:
+        print(f'start-up: {simulationStarted - started:.3f} s, '
+              f'run: {time.perf_counter() - simulationStarted:.3f} s',
+              file = sys.stderr)
+    return 0
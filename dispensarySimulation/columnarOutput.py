@@ -0,0 +1,70 @@
+import pathlib
+
+############################################################################
+###  Columnar output                                                     ###
+############################################################################
+#Instead of one .csv file per run (overwritten by the next run), the 
+#monitoring data of many runs can be collected as Parquet files, one per
+#run and table, in the directory layout 
+#  <root>/<table>/scenario=<scenarioKey>/replication=<r>/part-0.parquet
+#where table is
+#- 'monitoring': one row per prescription (unless rows are not kept),
+#- 'pickups': one row per pick-up,
+#- 'shifts': utilization and mean and maximum queue length of each stage
+#  (staff groups, vehicles and store) per shift (SimPy engine only),
+#- 'levels': the busy staff and queue lengths of each stage, and the items
+#  in the store, as means per hour (SimPy engine only; see stageMonitoring).
+#Columns are typed (names of weekdays are categorical), and
+#loadParquet only reads the partitions and columns it is asked for. This
+#needs the pyarrow package, which is only imported when it is used.
+
+#Converting a monitoring data-frame into a table of typed columns:
+def monitoringTable(monitoringDf, namesOfWeekdays):
+    import pandas
+    df = monitoringDf.rename_axis('prescription').reset_index()
+    for column in df.columns:
+        if column.startswith('dayOfWeek'):
+            df[column] = pandas.Categorical(df[column],
+                                            categories = namesOfWeekdays,
+                                            ordered = True)
+    return df
+
+def writeParquet(disp, root, scenario, replication):
+    import pyarrow
+    import pyarrow.parquet
+    tables = {'pickups': disp.pickupData.rename_axis('pickup').reset_index()}
+    if disp.monitoringDf is not None:
+        tables['monitoring'] = monitoringTable(disp.monitoringDf,
+                                               disp.namesOfWeekdays)
+    if disp.shiftData is not None:
+        tables['shifts'] = disp.shiftData
+        tables['levels'] = disp.levelSeries.reset_index()
+    for name, df in tables.items():
+        directory = pathlib.Path(root, name, f'scenario={scenario}',
+                                 f'replication={replication}')
+        directory.mkdir(parents = True, exist_ok = True)
+        pyarrow.parquet.write_table(
+          pyarrow.Table.from_pandas(df, preserve_index = False),
+          directory / 'part-0.parquet')
+
+#Reading (some columns of) one table for some scenarios and replications
+#(all of them, if not given) into a single data-frame; scenario and 
+#replication are added as columns.
+def loadParquet(root, table = 'monitoring', columns = None, scenarios = None,
+                replications = None):
+    import pyarrow.dataset
+    dataset = pyarrow.dataset.dataset(pathlib.Path(root, table),
+                                      format = 'parquet',
+                                      partitioning = 'hive')
+    condition = None
+    if scenarios is not None:
+        condition = pyarrow.dataset.field('scenario').isin(list(scenarios))
+    if replications is not None:
+        inReplications = pyarrow.dataset.field('replication').isin(
+                           list(replications))
+        condition = inReplications if condition is None \
+                    else condition & inReplications
+    if columns is not None:
+        columns = list(columns) + ['scenario', 'replication']
+    return dataset.to_table(columns = columns,
+                            filter = condition).to_pandas()
@@ -0,0 +1,43 @@
+import math
+import statistics
+
+############################################################################
+###  Confidence intervals                                                ###
+############################################################################
+#Quantile of Student's t-distribution (for confidence intervals); exact for
+#one and two degrees of freedom, otherwise a Cornish-Fisher expansion around
+#the quantile of the normal distribution (for 95% intervals, accurate to
+#about 0.1% with three degrees of freedom and to 0.01% from five on; less so
+#for higher confidence levels with few degrees of freedom):
+def tQuantile(probability, degreesOfFreedom):
+    v = degreesOfFreedom
+    if v == 1:
+        return math.tan(math.pi * (probability - 0.5))
+    if v == 2:
+        return (2 * probability - 1) / math.sqrt(2 * probability * \
+                                                 (1 - probability))
+    z = statistics.NormalDist().inv_cdf(probability)
+    return z + (z**3 + z) / (4 * v) \
+             + (5 * z**5 + 16 * z**3 + 3 * z) / (96 * v**2) \
+             + (3 * z**7 + 19 * z**5 + 17 * z**3 - 15 * z) / (384 * v**3) \
+             + (79 * z**9 + 776 * z**7 + 1482 * z**5 - 1920 * z**3 \
+                - 945 * z) / (92160 * v**4)
+
+#Mean and confidence interval (based on the t-distribution) of a list of
+#values, e.g. of one result across several replications. Values that are
+#not numbers (NaN, e.g. a mean throughput of a run without deliveries) are
+#left out.
+def confidenceInterval(values, confidence = 0.95):
+    values = [float(v) for v in values if not math.isnan(v)]
+    n = len(values)
+    mean = statistics.fmean(values) if n > 0 else math.nan
+    if n > 1:
+        halfWidth = tQuantile(0.5 + confidence / 2, n - 1) * \
+                    statistics.stdev(values) / math.sqrt(n)
+    else:
+        halfWidth = math.nan
+    return {'mean': mean,
+            'halfWidth': halfWidth,
+            'lower': mean - halfWidth,
+            'upper': mean + halfWidth,
+            'n': n}
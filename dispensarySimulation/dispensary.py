@@ -0,0 +1,182 @@
+import itertools
+
+from .recording import MonitoringRecorder, NullRecorder
+from .streamingStatistics import StreamingStatistics
+from .randomStreams import RandomStreams
+from .shiftCalendar import ShiftCalendar
+from .parameters import optionalParameters
+from .resources import MonitoredResource, OpenHoursClock
+from .arrivalProfiles import ArrivalProfile
+
+############################################################################
+### Object for each simulation run                                       ###
+############################################################################
+class Dispensary(object):
+  def __init__(self, env, parametersByUser, keepRows = True,
+               collectSeries = False):
+    self.env = env
+    self.parametersByUser = parametersByUser
+    self.averageStepDur = self.parametersByUser['averageStepDur'] #float
+    self.interarrivTime = self.parametersByUser['interarrivTime'] #float
+    #Rates per hour of the week (see optionalParameters), or None:
+    arrivalProfile = self.parametersByUser.get(
+                       'arrivalProfile', optionalParameters['arrivalProfile'])
+    self.arrivalProfile = None if arrivalProfile is None \
+                          else ArrivalProfile(arrivalProfile)
+    self.weekdayPickup = self.parametersByUser['weekdayPickup'] #list of numbers (times)
+    self.weekendPickup = self.parametersByUser['weekendPickup'] #list of numbers (times)
+    self.namesOfWeekdays = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', \
+                            'Friday', 'Saturday', 'Sunday']
+    self.openingHoursWeekdays = [9, 17.5]
+    self.openingHoursWeekends = [9, 13]
+    self.openingHours = self.openingHoursDict(self.openingHoursWeekdays, 
+                                              self.openingHoursWeekends, 
+                                              self.namesOfWeekdays)
+    self.calendar = ShiftCalendar(self.openingHours, self.namesOfWeekdays)
+    #The staff groups monitor how many of their staff are busy and how long
+    #their queues are (see MonitoredResource):
+    self.openHoursClock = OpenHoursClock(self.calendar)
+    self.Pharmacists = MonitoredResource(
+      env, self.parametersByUser['numPharmacists'], self.openHoursClock)
+    self.Labellers = MonitoredResource(
+      env, self.parametersByUser['numLabellers'], self.openHoursClock)
+    self.Dispensers = MonitoredResource(
+      env, self.parametersByUser['numDispensers'], self.openHoursClock)
+    self.FinalCheckers = MonitoredResource(
+      env, self.parametersByUser['numFinCheckers'], self.openHoursClock)
+    #Vehicles for pick-ups (see optionalParameters):
+    self.numVehicles = self.parametersByUser.get(
+                         'numVehicles', optionalParameters['numVehicles'])
+    self.Vehicles = MonitoredResource(env, self.numVehicles,
+                                      self.openHoursClock)
+    self.averageTranspDur = self.parametersByUser['averageTranspDur']
+    self.standDevOfTranspDur = self.parametersByUser['standDevOfTranspDur']
+    #Random numbers (reproducible, if a seed is given; antithetic runs are
+    #made by runReplications, see there):
+    self.streams = RandomStreams(self.parametersByUser.get('seed'),
+                                 antithetic = self.parametersByUser.get(
+                                                'antithetic', False))
+    self.transportTimes = self.endlessTransportTimes(self.weekdayPickup,
+                                                      self.weekendPickup)
+    self.shiftTimes = self.endlessShiftTimes(self.openingHoursWeekdays,
+                                              self.openingHoursWeekends)
+    #IDs of prescriptions (1, 2, ... over the whole run, i.e. not restarting
+    #with each shift, so that every prescription has its own row in the
+    #monitoring data):
+    self.prescriptionIds = itertools.count(1)
+    #Monitoring data are written into typed arrays by the two recorders
+    #below during the simulation run; the data-frames monitoringDf and
+    #pickupData are only built from these at the end of simulationRunner.
+    #Without keepRows, only the streaming statistics below are kept (apart
+    #from one row per pick-up):
+    self.stats = StreamingStatistics(collectSeries)
+    if keepRows:
+        self.recorder = MonitoringRecorder(['averageStepDur',
+                                            'interarrivTime',
+                                            'arrivalTime',
+                                            'timeOfDayOfArrival',
+                                            'dayOfWeekOfArrival',
+                                            'verifStarted',
+                                            'verifFinished',
+                                            'labelStarted',
+                                            'labelFinished',
+                                            'dispStarted',
+                                            'dispFinished',
+                                            'finCheckStarted',
+                                            'finCheckFinished',
+                                            'putInStore',
+                                            'timeOfDayOfPutInStore',
+                                            'dayOfWeekOfPutInStore',
+                                            'timeOfPickup',
+                                            'timeOfDelivery'],
+                                           ['dayOfWeekOfArrival',
+                                            'dayOfWeekOfPutInStore'],
+                                           self.namesOfWeekdays)
+    else:
+        self.recorder = NullRecorder()
+    self.pickupRecorder = MonitoringRecorder(['timeBeforePickup',
+                                              'itemsInStoreBefore',
+                                              'timeAfterPickup',
+                                              'itemsInStoreAfter'],
+                                             [],
+                                             self.namesOfWeekdays)
+    self.monitoringDf = None
+    self.pickupData = None
+    self.shiftData = None
+    self.levelSeries = None
+    self.dispatcher = None
+    #Pick-up times and trip durations given by a network (see network.py);
+    #None for a dispensary with its own vehicles:
+    self.networkPickups = None
+    #Trace of arrivals to replay (see traces.py); None for drawn arrivals:
+    self.trace = None
+    self.resultsDict = self.parametersByUser
+  
+  #This function merely creates a dictionary of opening hours for convenience:
+  def openingHoursDict(self, openingHoursWeekdays, openingHoursWeekends,
+    namesOfWeekdays):
+      openingDict = {}
+      for day in namesOfWeekdays[:5]:
+          openingDict.update({day: openingHoursWeekdays})
+      for day in namesOfWeekdays[5:]:
+          openingDict.update({day: openingHoursWeekends})
+      return openingDict
+  
+  #Establishing the time of day against the simulation time (which could be
+  #a very large number).
+  def timeOfDayEstablisher(self, simulationTime):
+      return self.calendar.timeOfDay(simulationTime)
+    
+  #This simulation assumes that one unit of simulation time corresponds to
+  #one hour of real time. The function below returns the name of the week
+  #(as defined before) against the simulation Time.
+  def hoursToWeekdayConverter(self, simulationTime):
+      return self.calendar.nameOfWeekday(simulationTime)
+    
+  #Generating an endless sequence of times when dispensary shifts start
+  #and stop, respectively:
+  def endlessShiftTimes(self, 
+                        openingHoursWeekdays,
+                        openingHoursWeekends):
+      hoursPassed = 0
+      while True:
+          for day in range(1, 6):
+              for alt in range(2):
+                  nextTime = hoursPassed + openingHoursWeekdays[alt] 
+                  yield nextTime
+              hoursPassed += 24
+          for day in range(6, 8):
+              for alt in range(2):
+                  nextTime = hoursPassed + openingHoursWeekends[alt]
+                  yield nextTime
+              hoursPassed += 24
+              
+  #Generating an endless sequence of delivery times from
+  #the dispensary to units in simulation time:
+  def endlessTransportTimes(self, 
+                            transportWeekdays,
+                            transportWeekends):
+      hoursPassed = 0
+      while True:
+          for day in range(1, 6):
+              for t in transportWeekdays:
+                  nextTime = hoursPassed + t 
+                  yield nextTime
+              hoursPassed += 24
+          for day in range(6, 8):
+              for t in transportWeekends:
+                  nextTime = hoursPassed + t
+                  yield nextTime
+              hoursPassed += 24   
+  
+  #The delay due to an activity, started at a given time-point during a shift,
+  #might need to be adjusted, given time-periods when staff are active and
+  #inactive, respectively. This function takes a period, as calculated or
+  #estimated by the simulation model, and distributes it over several shifts,
+  #if it exceeds the end of the shift in which it started, adding inactivity
+  #periods to the overall delay, if necessary. The activity is assumed to
+  #start at startTime (i.e. when the resource has been obtained); if this
+  #is outside opening hours, the activity only starts at the next opening.
+  def durationAdjuster(self, timeToProcessPrescription, startTime):
+      return self.calendar.finishTime(startTime, timeToProcessPrescription) \
+             - startTime
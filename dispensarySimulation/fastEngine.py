@@ -0,0 +1,183 @@
+import heapq
+import numpy
+
+from .traces import traceUntil
+
+############################################################################
+###  Fast (vectorised) engine                                            ###
+############################################################################
+#The process is a fixed sequence of four steps, each with its own group of
+#staff working in order of arrival, followed by pick-ups at fixed times and
+#transport. For such a line of queues, the times when each prescription 
+#starts and finishes each step can be calculated directly, without simulating
+#each prescription as a SimPy process. All times are converted into open 
+#hours (see ShiftCalendar), in which steps are never interrupted by closing
+#times; the results are converted back into simulation time at the end.
+
+#Times when the prescriptions start a step, given the times when they are
+#ready for it (sorted in ascending order), the durations of the step and the
+#number of staff. With one member of staff, this is Lindley's recursion
+#(finish = max(ready, previous finish) + duration), which can be solved with
+#cumulative sums and maxima; otherwise each prescription is given to the
+#member of staff who is free first (kept in a heap).
+def stepStartTimes(readyTimes, durations, staff):
+    if staff == 1:
+        durationsSoFar = numpy.cumsum(durations)
+        finishTimes = durationsSoFar + numpy.maximum.accumulate(
+                        readyTimes - (durationsSoFar - durations))
+        return finishTimes - durations
+    freeAt = [0.0] * staff
+    startTimes = []
+    for ready, duration in zip(readyTimes.tolist(), durations.tolist()):
+        start = ready if ready > freeAt[0] else freeAt[0]
+        heapq.heapreplace(freeAt, start + duration)
+        startTimes.append(start)
+    return numpy.array(startTimes)
+
+#Start and finish times (in simulation time) of the four steps for 
+#prescriptions arriving at the given times; as if the simulation went on
+#forever (see lindleyEngine for cutting them off at the end of a run). The
+#durations of the steps may be given (one column per step, e.g. by a trace).
+def fourStepTimes(disp, arrivalTimes, durationsPerStep = None):
+    steps = [('verif', disp.Pharmacists, disp.streams.verification),
+             ('label', disp.Labellers, disp.streams.labelling),
+             ('disp', disp.Dispensers, disp.streams.dispensing),
+             ('finCheck', disp.FinalCheckers, disp.streams.finalCheck)]
+    times = {}
+    readyTimes = disp.calendar.openHoursUntilArray(arrivalTimes)
+    for i, (name, staffGroup, stream) in enumerate(steps):
+        #(the k-th prescription gets the k-th number of the stream, as in
+        #prescriptionProcessor)
+        if durationsPerStep is not None:
+            durations = durationsPerStep[:, i]
+        else:
+            durations = disp.averageStepDur * stream.draw(len(arrivalTimes))
+        #prescriptions queue for a step in the order they became ready:
+        order = numpy.argsort(readyTimes, kind = 'stable')
+        startTimes = numpy.empty(len(arrivalTimes))
+        startTimes[order] = stepStartTimes(readyTimes[order], durations[order],
+                                           staffGroup.capacity)
+        finishTimes = startTimes + durations
+        times[name + 'Started'] = \
+          disp.calendar.timeAfterOpenHoursArray(startTimes, atOpening = True)
+        times[name + 'Finished'] = \
+          disp.calendar.timeAfterOpenHoursArray(finishTimes)
+        readyTimes = finishTimes
+    return times
+
+#Arrival times during opening hours until the given time, in the same way
+#as prescriptionGenerator produces them: the first prescription of a shift
+#arrives when the shift starts, the next ones at exponentially distributed
+#intervals for as long as the shift lasts. With an arrival profile, they
+#are drawn for each whole shift, as by prescriptionGenerator, and those
+#from until on are left out.
+def arrivalTimesUntil(disp, until):
+    stream = disp.streams.arrivals
+    shiftTimes = disp.endlessShiftTimes(disp.openingHoursWeekdays,
+                                        disp.openingHoursWeekends)
+    arrivals = []
+    shiftStart = next(shiftTimes)
+    while shiftStart < until:
+        if disp.arrivalProfile is not None:
+            times = disp.arrivalProfile.arrivalsBetween(
+                      shiftStart, next(shiftTimes), stream)
+            arrivals.append(times[times < until])
+            shiftStart = next(shiftTimes)
+            continue
+        shiftEnd = min(next(shiftTimes), numpy.nextafter(until, 0))
+        arrivals.append(numpy.array([shiftStart]))
+        time = shiftStart
+        while time <= shiftEnd:
+            expected = int((shiftEnd - time) / disp.interarrivTime)
+            intervals = disp.interarrivTime * stream.draw(expected + 16)
+            times = time + numpy.cumsum(intervals)
+            arrivals.append(times[times <= shiftEnd])
+            time = times[-1]
+        shiftStart = next(shiftTimes)
+    return numpy.concatenate(arrivals) if arrivals else numpy.zeros(0)
+
+#Calculating a whole simulation run until the given time and writing the
+#results into disp.recorder and disp.pickupRecorder (as the SimPy processes
+#do). Prescriptions are numbered 1, 2, ... in order of arrival.
+def lindleyEngine(disp, until):
+    if disp.trace is not None:
+        arrivalTimes, durations = traceUntil(disp.trace, until)
+    else:
+        arrivalTimes, durations = arrivalTimesUntil(disp, until), None
+    times = fourStepTimes(disp, arrivalTimes, durations)
+    putInStore = times['finCheckFinished']
+    #Pick-ups at the times given by the transport schedule; each takes 
+    #everything that has been put into the store by then. The vehicles are
+    #a further 'step' (for pick-ups rather than prescriptions): a pick-up
+    #is delayed if all vehicles are still on their way to the units. (In a
+    #network, the pick-ups are given, see network.py.)
+    if disp.networkPickups is not None:
+        pickups = numpy.array(disp.networkPickups, dtype = float)
+        pickupTimes = pickups[:, 0] if len(pickups) else numpy.zeros(0)
+        transportDurations = pickups[:, 1] if len(pickups) \
+                             else numpy.zeros(0)
+    else:
+        scheduledTimes = []
+        for pickupTime in disp.endlessTransportTimes(disp.weekdayPickup,
+                                                     disp.weekendPickup):
+            if pickupTime >= until:
+                break
+            scheduledTimes.append(pickupTime)
+        scheduledTimes = numpy.array(scheduledTimes, dtype = float)
+        transportDurations = disp.averageTranspDur + \
+          disp.standDevOfTranspDur * \
+          disp.streams.transport.draw(len(scheduledTimes))
+        pickupTimes = stepStartTimes(scheduledTimes, transportDurations,
+                                     disp.numVehicles)
+    pickupTimes = pickupTimes[pickupTimes < until]
+    pickup = numpy.searchsorted(pickupTimes, putInStore, side = 'left')
+    pickedUp = pickup < len(pickupTimes)
+    times['timeOfPickup'] = numpy.full(len(arrivalTimes), numpy.nan)
+    times['timeOfPickup'][pickedUp] = pickupTimes[pickup[pickedUp]]
+    times['timeOfDelivery'] = numpy.full(len(arrivalTimes), numpy.nan)
+    times['timeOfDelivery'][pickedUp] = pickupTimes[pickup[pickedUp]] + \
+                                        transportDurations[pickup[pickedUp]]
+    times['putInStore'] = putInStore
+    #Everything that would only happen at or after the end of the run is
+    #not recorded:
+    for name in times:
+        times[name][times[name] >= until] = numpy.nan
+    
+    disp.stats.arrivals += len(arrivalTimes)
+    pickedUp = ~numpy.isnan(times['timeOfPickup'])
+    t = {name: values[pickedUp] for name, values in times.items()}
+    disp.stats.addPickups({
+      'waitingForVerif': t['verifStarted'] - arrivalTimes[pickedUp],
+      'waitingForLabel': t['labelStarted'] - t['verifFinished'],
+      'waitingForDisp': t['dispStarted'] - t['labelFinished'],
+      'waitingForFinCheck': t['finCheckStarted'] - t['dispFinished'],
+      'waitingForTransp': t['timeOfPickup'] - t['putInStore']})
+    delivered = ~numpy.isnan(times['timeOfDelivery'])
+    disp.stats.addDeliveries(times['timeOfDelivery'][delivered] - \
+                             arrivalTimes[delivered])
+    
+    rowIds = numpy.arange(1, len(arrivalTimes) + 1)
+    rec = disp.recorder
+    rec.recordColumn(rowIds, 'averageStepDur', disp.averageStepDur)
+    rec.recordColumn(rowIds, 'interarrivTime', disp.interarrivTime)
+    rec.recordColumn(rowIds, 'arrivalTime', arrivalTimes)
+    rec.recordColumn(rowIds, 'timeOfDayOfArrival',
+                     disp.calendar.timeOfDay(arrivalTimes))
+    rec.recordColumn(rowIds, 'dayOfWeekOfArrival',
+                     disp.calendar.weekdayCodes(arrivalTimes))
+    for name, values in times.items():
+        rec.recordColumn(rowIds, name, values)
+    inStore = ~numpy.isnan(putInStore)
+    rec.recordColumn(rowIds[inStore], 'timeOfDayOfPutInStore',
+                     disp.calendar.timeOfDay(putInStore[inStore]))
+    rec.recordColumn(rowIds[inStore], 'dayOfWeekOfPutInStore',
+                     disp.calendar.weekdayCodes(putInStore[inStore]))
+    
+    itemsPerPickup = numpy.bincount(pickup[pickedUp],
+                                    minlength = len(pickupTimes))
+    pickupIds = numpy.arange(len(pickupTimes))
+    disp.pickupRecorder.recordColumn(pickupIds, 'timeBeforePickup', pickupTimes)
+    disp.pickupRecorder.recordColumn(pickupIds, 'itemsInStoreBefore',
+                                     itemsPerPickup)
+    disp.pickupRecorder.recordColumn(pickupIds, 'timeAfterPickup', pickupTimes)
+    disp.pickupRecorder.recordColumn(pickupIds, 'itemsInStoreAfter', 0)
@@ -0,0 +1,138 @@
+import itertools
+import os
+import pickle
+import traceback
+import simpy
+
+from .dispensary import Dispensary
+from .randomStreams import RandomStreams
+from .resources import MonitoredStore
+from .runner import startProcesses, runResults
+from .scenarios import scenarioKey
+
+############################################################################
+###  Checkpoint and fork                                                 ###
+############################################################################
+#Running variants of a scenario which only differ from a given time on, e.g.
+#different pick-up times from Wednesday (forkTime = 48) onward:
+#  forkRuns(defaultParameters, 48, [{'weekdayPickup': [10, 15]},
+#                                   {'weekdayPickup': [10, 12, 15, 17]}])
+#The part before the fork time (e.g. a warm-up) is simulated only once. Its
+#state (queued and busy prescriptions, store, calendar generators, random
+#numbers, recorded data) cannot be copied with pickle, as SimPy processes
+#are generators; instead, the process running the simulation is forked at
+#the fork time (os.fork, i.e. on POSIX systems only), which copies all of
+#it (copy-on-write). Each variant continues in its own child process and
+#sends its results back through a pipe. Variants continue with the same
+#random numbers (i.e. common random numbers), unless they give a 'seed'.
+#The results cover the whole run (including the shared part); they hold
+#the parameters of the variant and the fork time (utilizations refer to
+#the numbers of staff of the variant).
+
+#Parameters which a variant can change, and the staff groups (resources)
+#for the numbers of staff:
+variantParameters = ['averageStepDur', 'interarrivTime', 'averageTranspDur',
+                     'standDevOfTranspDur', 'weekdayPickup', 'weekendPickup',
+                     'seed']
+resourceOfParameter = {'numPharmacists': 'Pharmacists',
+                       'numLabellers': 'Labellers',
+                       'numDispensers': 'Dispensers',
+                       'numFinCheckers': 'FinalCheckers',
+                       'numVehicles': 'Vehicles'}
+
+def checkVariants(variants):
+    for variant in variants:
+        for name in variant:
+            if name not in variantParameters and \
+               name not in resourceOfParameter:
+                raise ValueError(f"'{name}' cannot be changed by a variant "
+                                 f"(only {variantParameters} and "
+                                 f"{list(resourceOfParameter)})")
+
+#Changing the parameters of a (forked) simulation at the current time:
+def applyVariant(env, disp, variant):
+    for name, value in variant.items():
+        disp.parametersByUser[name] = value
+        if name in resourceOfParameter:
+            getattr(disp, resourceOfParameter[name]).setCapacity(value)
+            if name == 'numVehicles':
+                disp.numVehicles = value
+        elif name == 'seed':
+            disp.streams = RandomStreams(value,
+                                         antithetic = disp.streams.antithetic)
+        else:
+            setattr(disp, name, value)
+    if 'weekdayPickup' in variant or 'weekendPickup' in variant:
+        #the new pick-up times from now on; the dispatcher, if waiting for
+        #the next pick-up of the old ones, is interrupted:
+        disp.transportTimes = itertools.dropwhile(
+          lambda pickupTime: pickupTime < env.now,
+          disp.endlessTransportTimes(disp.weekdayPickup, disp.weekendPickup))
+        if isinstance(disp.dispatcher.target, simpy.events.Timeout):
+            disp.dispatcher.interrupt()
+
+#Continuing the simulation with a variant in a child process; the results
+#(or the error) are written into the pipe:
+def runVariant(env, store, disp, variant, forkTime, horizon, keepRows,
+               steadyState, parquetRoot, index, pipe):
+    try:
+        applyVariant(env, disp, variant)
+        disp.parametersByUser['forkTime'] = forkTime
+        env.run(until = horizon)
+        results = runResults(env, store, disp, 'simpy', keepRows, steadyState,
+                             None, parquetRoot,
+                             scenarioKey(disp.parametersByUser), index)
+        payload = pickle.dumps(('results', results))
+    except BaseException:
+        payload = pickle.dumps(('error', traceback.format_exc()))
+    with os.fdopen(pipe, 'wb') as file:
+        file.write(payload)
+
+def receiveResults(pid, pipe):
+    with os.fdopen(pipe, 'rb') as file:
+        kind, payload = pickle.loads(file.read())
+    os.waitpid(pid, 0)
+    if kind == 'error':
+        raise RuntimeError(f'A variant failed in its child process:\n'
+                           f'{payload}')
+    return payload
+
+#Simulating until forkTime, then each variant (a dictionary of changed
+#parameters) until horizon, in up to workers child processes at a time.
+#Returns the results of the variants (in the same order). With a
+#parquetRoot, the monitoring data of each variant are written there, as
+#replication 0, 1, ... (its index among the variants).
+def forkRuns(parametersByUser, forkTime, variants, horizon = 168,
+             keepRows = True, steadyState = False, parquetRoot = None,
+             workers = None):
+    if not hasattr(os, 'fork'):
+        raise RuntimeError('forkRuns needs os.fork (i.e. a POSIX system)')
+    checkVariants(variants)
+    workers = workers or os.cpu_count() or 1
+    env = simpy.Environment()
+    disp = Dispensary(env, dict(parametersByUser), keepRows, steadyState)
+    store = MonitoredStore(env, 1000000, disp.openHoursClock)
+    startProcesses(env, store, disp)
+    env.run(until = forkTime)
+
+    results = [None] * len(variants)
+    running = []
+    for index, variant in enumerate(variants):
+        if len(running) == workers:
+            oldest, pid, pipe = running.pop(0)
+            results[oldest] = receiveResults(pid, pipe)
+        readEnd, writeEnd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            try:
+                os.close(readEnd)
+                runVariant(env, store, disp, variant, forkTime, horizon,
+                           keepRows, steadyState, parquetRoot, index,
+                           writeEnd)
+            finally:
+                os._exit(0)
+        os.close(writeEnd)
+        running.append((index, pid, readEnd))
+    for index, pid, pipe in running:
+        results[index] = receiveResults(pid, pipe)
+    return results
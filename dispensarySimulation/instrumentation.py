@@ -0,0 +1,173 @@
+import time
+
+############################################################################
+###  Instrumentation of simulation runs                                  ###
+############################################################################
+#Showing where the time of a (slow) run goes. Instrumentation is opt-in
+#(simulationRunner(..., instrument = True)): only then are the methods below
+#wrapped, on the instances of a single run (never on the classes), so that
+#runs without instrumentation do not pay anything for it. The report holds
+#- processes: per SimPy process type (i.e. generator function), the number
+#  of processes started, the events they waited for and the wall time spent
+#  inside them (including the calls below),
+#- calls: number and wall time of calls to durationAdjuster and to the
+#  recorders and streaming statistics,
+#- resources: per staff group, for the vehicles and for the store, the
+#  number of requests, how many of these had to queue and the queue lengths
+#  seen by requests.
+#Wrapping every call costs some time itself, so the absolute times are a
+#bit higher than in a run without instrumentation.
+
+class Instrumentation(object):
+  def __init__(self, env, disp, store = None):
+    self.env = env
+    self.events = 0
+    self.processes = {}
+    self.calls = {}
+    self.resources = {}
+    self.startedAt = time.perf_counter()
+    self.wrapEnvironment(env)
+    self.timeCalls(disp, ['durationAdjuster'], 'disp')
+    self.timeCalls(disp.recorder, ['record', 'recordWeekday', 'recordColumn'],
+                   'recorder')
+    self.timeCalls(disp.pickupRecorder, ['record'], 'pickupRecorder')
+    self.timeCalls(disp.stats, ['addArrival', 'addPickups', 'addDeliveries'],
+                   'stats')
+    for name in ['Pharmacists', 'Labellers', 'Dispensers', 'FinalCheckers',
+                 'Vehicles']:
+        self.countRequests(getattr(disp, name), name)
+    if store is not None:
+        self.countStore(store)
+
+  #Counting all events and wrapping every new process:
+  def wrapEnvironment(self, env):
+      step = env.step
+      process = env.process
+      def countedStep():
+          self.events += 1
+          return step()
+      def instrumentedProcess(generator):
+          return process(self.instrumentedGenerator(generator))
+      env.step = countedStep
+      env.process = instrumentedProcess
+
+  #Passing everything between SimPy and the generator of a process (also
+  #exceptions thrown into it, e.g. interrupts), while counting and timing
+  #each time the generator is resumed:
+  def instrumentedGenerator(self, generator):
+      stat = self.processes.setdefault(generator.__name__,
+                                       {'started': 0, 'events': 0,
+                                        'time': 0.0})
+      stat['started'] += 1
+      value = None
+      exception = None
+      while True:
+          started = time.perf_counter()
+          try:
+              if exception is None:
+                  event = generator.send(value)
+              else:
+                  event = generator.throw(exception)
+          except StopIteration as stop:
+              return stop.value
+          finally:
+              stat['time'] += time.perf_counter() - started
+          stat['events'] += 1
+          exception = None
+          try:
+              value = yield event
+          except BaseException as thrown:
+              exception = thrown
+
+  def timeCalls(self, instance, methodNames, group):
+      for methodName in methodNames:
+          stat = self.calls.setdefault(f'{group}.{methodName}',
+                                       {'calls': 0, 'time': 0.0})
+          setattr(instance, methodName,
+                  self.timedFunction(getattr(instance, methodName), stat))
+
+  def timedFunction(self, function, stat):
+      def timed(*args, **kwargs):
+          started = time.perf_counter()
+          try:
+              return function(*args, **kwargs)
+          finally:
+              stat['calls'] += 1
+              stat['time'] += time.perf_counter() - started
+      return timed
+
+  def queueStat(self, name, capacity):
+      stat = {'capacity': capacity, 'requests': 0, 'queued': 0,
+              'queueLengthSum': 0, 'maxQueueLength': 0}
+      self.resources[name] = stat
+      return stat
+
+  def seenQueue(self, stat, queueLength, busy):
+      stat['requests'] += 1
+      stat['queued'] += busy
+      stat['queueLengthSum'] += queueLength
+      stat['maxQueueLength'] = max(stat['maxQueueLength'], queueLength)
+
+  #Counting the requests of a staff group and the queue each request finds
+  #when it is made:
+  def countRequests(self, resource, name):
+      stat = self.queueStat(name, resource.capacity)
+      request = resource.request
+      def countedRequest():
+          self.seenQueue(stat, len(resource.queue),
+                         resource.count >= resource.capacity)
+          return request()
+      resource.request = countedRequest
+
+  #The same for the store of finished prescriptions (the 'queue' being the
+  #items waiting for a pick-up):
+  def countStore(self, store):
+      stat = self.queueStat('store', store.capacity)
+      put = store.put
+      def countedPut(item):
+          self.seenQueue(stat, len(store.items),
+                         len(store.items) >= store.capacity)
+          return put(item)
+      store.put = countedPut
+
+  def report(self):
+      wallTime = time.perf_counter() - self.startedAt
+      processes = {name: dict(stat, share = stat['time'] / wallTime)
+                   for name, stat in self.processes.items()}
+      calls = {name: dict(stat, share = stat['time'] / wallTime,
+                          timePerCall = stat['time'] / max(stat['calls'], 1))
+               for name, stat in self.calls.items()}
+      resources = {}
+      for name, stat in self.resources.items():
+          resources[name] = {'capacity': stat['capacity'],
+                             'requests': stat['requests'],
+                             'queued': stat['queued'],
+                             'meanQueueLength': stat['queueLengthSum']
+                                                / max(stat['requests'], 1),
+                             'maxQueueLength': stat['maxQueueLength']}
+      return {'wallTime': wallTime,
+              'events': self.events,
+              'processes': processes,
+              'calls': calls,
+              'resources': resources}
+
+#Profiling a function call with cProfile: the statistics are dumped to
+#path (for pstats or e.g. snakeviz) and the functions with the highest
+#cumulative time are returned (together with the result of the call):
+def profiledCall(path, function, *args, top = 20, **kwargs):
+    import cProfile
+    import pstats
+    profile = cProfile.Profile()
+    result = profile.runcall(function, *args, **kwargs)
+    profile.dump_stats(path)
+    stats = pstats.Stats(profile)
+    entries = sorted(stats.stats.items(), key = lambda entry: entry[1][3],
+                     reverse = True)[:top]
+    hotspots = [{'function': f'{filename}:{line}({name})',
+                 'calls': calls,
+                 'ownTime': ownTime,
+                 'cumulativeTime': cumulativeTime}
+                for (filename, line, name),
+                    (primitiveCalls, calls, ownTime, cumulativeTime, callers)
+                in entries]
+    return result, hotspots
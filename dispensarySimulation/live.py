@@ -0,0 +1,189 @@
+import json
+import math
+import time
+
+############################################################################
+###  Live KPIs                                                           ###
+############################################################################
+#Following a long run while it goes on, and stopping it early if it turns
+#out to be a bad scenario: an observer (any function taking a dictionary)
+#is called every observeInterval simulated hours with rolling KPIs:
+#  simulationRunner(params, horizon = 8760, observer = print)
+#The KPIs are the simulated and wall time, the numbers of arrived and
+#completed (delivered) prescriptions, the mean throughput time of the
+#prescriptions delivered since the last call, the queue length of each
+#staff group and of the vehicles and the number of prescriptions in the
+#store. An observer stops the run by raising StopSimulation; the results
+#then cover the run until that time (see simulationRunner). Observers are
+#only called by the SimPy engine.
+#KpiServer publishes the KPIs on a local HTTP server (with asyncio, in a
+#thread of its own, so that the simulation is not slowed down by clients):
+#  server = KpiServer(port = 8765)
+#  simulationRunner(params, horizon = 8760, observer = server.observer)
+#  server.close()
+#- GET /events: a stream of server-sent events, one per call of the
+#  observer (e.g. curl -N http://127.0.0.1:8765/events),
+#- GET /kpis: the latest KPIs (as JSON),
+#- POST (or GET) /stop: stops the run at the next call of the observer.
+#From the command line: python -m dispensarySimulation --live 8765
+
+class StopSimulation(Exception):
+    pass
+
+stageNames = ['Pharmacists', 'Labellers', 'Dispensers', 'FinalCheckers',
+              'Vehicles']
+
+#SimPy process calling the observer every interval hours:
+def observerProcess(env, store, disp, observer, interval):
+    started = time.perf_counter()
+    previousDelivered = 0
+    previousTotal = 0.0
+    while True:
+        yield env.timeout(interval)
+        moments = disp.stats.moments['throughputTime']
+        total = moments.mean * moments.n
+        recent = moments.n - previousDelivered
+        observer({'time': env.now,
+                  'wallTime': time.perf_counter() - started,
+                  'arrivals': disp.stats.arrivals,
+                  'completed': disp.stats.delivered,
+                  'recentDeliveries': recent,
+                  'recentThroughput': (total - previousTotal) / recent
+                                      if recent > 0 else None,
+                  'queueLengths': {name: len(getattr(disp, name).queue)
+                                   for name in stageNames},
+                  'storeOccupancy': len(store.items)})
+        previousDelivered = moments.n
+        previousTotal = total
+
+class KpiServer(object):
+  def __init__(self, host = '127.0.0.1', port = 8765, queueSize = 100):
+    import asyncio
+    import threading
+    self.host = host
+    self.port = port
+    self.queueSize = queueSize
+    self.latest = None
+    self.subscribers = set()
+    self.stopRequested = threading.Event()
+    self.loop = asyncio.new_event_loop()
+    self.startError = None
+    started = threading.Event()
+    self.thread = threading.Thread(target = self.serve, args = (started,),
+                                   daemon = True)
+    self.thread.start()
+    started.wait()
+    if self.startError is not None:
+        self.thread.join()
+        raise self.startError
+
+  #Running the server in its own thread (with port 0, a free port is
+  #chosen, which is then in self.port). If the server cannot be started
+  #(e.g. the port is in use), the error is raised by __init__:
+  def serve(self, started):
+      import asyncio
+      asyncio.set_event_loop(self.loop)
+      try:
+          self.server = self.loop.run_until_complete(
+                          asyncio.start_server(self.handle, self.host,
+                                               self.port))
+          self.port = self.server.sockets[0].getsockname()[1]
+      except Exception as error:
+          self.startError = error
+          self.loop.close()
+          return
+      finally:
+          started.set()
+      self.loop.run_forever()
+      self.server.close()
+      self.loop.run_until_complete(self.server.wait_closed())
+      self.loop.close()
+
+  async def handle(self, reader, writer):
+      try:
+          requestLine = (await reader.readline()).decode('latin-1').split()
+          #(the headers are not needed)
+          while (await reader.readline()).strip():
+              pass
+          path = requestLine[1].split('?')[0] if len(requestLine) > 1 else ''
+          if path == '/events':
+              await self.stream(writer)
+          elif path == '/kpis':
+              await self.respond(writer, 200, self.latest)
+          elif path == '/stop':
+              self.stopRequested.set()
+              await self.respond(writer, 200, {'stopping': True})
+          else:
+              await self.respond(writer, 404, {'error': 'not found'})
+      except (ConnectionError, OSError):
+          pass
+      finally:
+          writer.close()
+
+  async def respond(self, writer, status, content):
+      body = json.dumps(content).encode()
+      reason = 'OK' if status == 200 else 'Not Found'
+      writer.write(f'HTTP/1.1 {status} {reason}\r\n'
+                   f'Content-Type: application/json\r\n'
+                   f'Content-Length: {len(body)}\r\n'
+                   f'Connection: close\r\n\r\n'.encode() + body)
+      await writer.drain()
+
+  #Server-sent events: the latest KPIs, then each new set of them, until
+  #the server is closed (a client too slow to keep up misses some):
+  async def stream(self, writer):
+      import asyncio
+      queue = asyncio.Queue(self.queueSize)
+      self.subscribers.add(queue)
+      try:
+          writer.write(b'HTTP/1.1 200 OK\r\nContent-Type: text/event-stream'
+                       b'\r\nCache-Control: no-cache\r\n\r\n')
+          kpis = self.latest
+          while True:
+              if kpis is not None:
+                  writer.write(f'data: {json.dumps(kpis)}\n\n'.encode())
+                  await writer.drain()
+              kpis = await queue.get()
+              if kpis is None:
+                  break
+      finally:
+          self.subscribers.discard(queue)
+
+  def broadcast(self, kpis):
+      import asyncio
+      for queue in self.subscribers:
+          try:
+              queue.put_nowait(kpis)
+          except asyncio.QueueFull:
+              pass
+
+  #Publishing a set of KPIs (from the thread of the simulation):
+  def publish(self, kpis):
+      kpis = {name: None if isinstance(value, float) and math.isnan(value)
+              else value for name, value in kpis.items()}
+      self.latest = kpis
+      self.loop.call_soon_threadsafe(self.broadcast, kpis)
+
+  #The observer for simulationRunner:
+  def observer(self, kpis):
+      self.publish(kpis)
+      if self.stopRequested.is_set():
+          raise StopSimulation()
+
+  #Ending the streams (waiting up to a second for them to be sent) and
+  #stopping the server:
+  async def shutdown(self):
+      import asyncio
+      self.broadcast(None)
+      for attempt in range(100):
+          if not self.subscribers:
+              break
+          await asyncio.sleep(0.01)
+      self.loop.stop()
+
+  def close(self):
+      import asyncio
+      if self.loop.is_closed():
+          return
+      asyncio.run_coroutine_threadsafe(self.shutdown(), self.loop)
+      self.thread.join()
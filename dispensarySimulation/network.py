@@ -0,0 +1,131 @@
+import concurrent.futures
+import math
+import os
+import numpy
+import simpy
+
+from .dispensary import Dispensary
+from .fastEngine import stepStartTimes
+from .runner import simulationRunner
+
+############################################################################
+###  Networks of dispensaries                                            ###
+############################################################################
+#Simulating several dispensaries (sites), each with its own parameters
+#(staffing, pick-up times, ...), whose pick-ups share one pool of drivers,
+#e.g.
+#  networkRuns([dict(defaultParameters, weekdayPickup = [10, 15]),
+#               dict(defaultParameters, numDispensers = 4)], numDrivers = 2)
+#The sites are only coupled through the drivers, i.e. at their pick-up
+#times: every pick-up takes a driver (as soon as one is back, if all are on
+#their way to units), however many prescriptions are waiting. Which driver
+#is free when depends on the pick-up times and trip durations of all sites,
+#but not on anything else going on at the sites, so the shared transport is
+#worked out first, for the whole network at once (pick-ups in order of
+#their scheduled times, as the vehicles of a single site in fastEngine.py).
+#The sites are then independent of each other; they are simulated in
+#shards (groups of sites) in worker processes, each with its actual pick-up
+#times and trip durations. A network thus takes about as long as its
+#slowest shard. The numVehicles of the sites are not used.
+
+#Pick-ups of all sites with a shared pool of drivers: per site, the pairs
+#of actual pick-up time and trip duration (until horizon), and statistics
+#of the drivers. The trip durations are drawn from the transport stream
+#of each site (i.e. from its seed), the k-th trip of a site getting the
+#k-th number, as in a run of the site alone.
+def sharedTransport(sites, numDrivers, horizon):
+    scheduledTimes = []
+    durations = []
+    siteIndices = []
+    for i, params in enumerate(sites):
+        disp = Dispensary(simpy.Environment(), dict(params), keepRows = False)
+        times = []
+        for pickupTime in disp.endlessTransportTimes(disp.weekdayPickup,
+                                                     disp.weekendPickup):
+            if pickupTime >= horizon:
+                break
+            times.append(pickupTime)
+        scheduledTimes.append(numpy.array(times, dtype = float))
+        durations.append(disp.averageTranspDur + disp.standDevOfTranspDur *
+                         disp.streams.transport.draw(len(times)))
+        siteIndices.append(numpy.full(len(times), i))
+    scheduledTimes = numpy.concatenate(scheduledTimes)
+    durations = numpy.concatenate(durations)
+    siteIndices = numpy.concatenate(siteIndices)
+    #pick-ups at the same time are served in the order of the sites:
+    order = numpy.lexsort((siteIndices, scheduledTimes))
+    pickupTimes = numpy.empty(len(order))
+    pickupTimes[order] = stepStartTimes(scheduledTimes[order],
+                                        durations[order], numDrivers)
+    happened = pickupTimes < horizon
+    pickups = [list(zip(pickupTimes[happened & (siteIndices == i)].tolist(),
+                        durations[happened & (siteIndices == i)].tolist()))
+               for i in range(len(sites))]
+    delays = (pickupTimes - scheduledTimes)[happened]
+    busyTime = numpy.minimum(pickupTimes + durations, horizon) - pickupTimes
+    return pickups, {'numDrivers': numDrivers,
+                     'pickups': int(happened.sum()),
+                     'meanDriverDelay': float(delays.mean()) if len(delays)
+                                        else math.nan,
+                     'maxDriverDelay': float(delays.max()) if len(delays)
+                                       else math.nan,
+                     #(share of the simulated time, not of opening hours,
+                     #as trips may go on after closing)
+                     'driverUtilization': float(busyTime[happened].sum()) /
+                                          (numDrivers * horizon)}
+
+#Running one site of a network (in a worker process):
+def siteRunner(parametersByUser, pickups, runOptions):
+    results = simulationRunner(parametersByUser, outputPath = None,
+                               pickups = pickups, **runOptions)
+    #(the vehicles of the site are not used, see above)
+    results.get('stages', {}).pop('Vehicles', None)
+    return results
+
+#Results of the whole network: numbers of prescriptions added up, means
+#weighted by the numbers of prescriptions they are taken over:
+def networkSummary(siteResults):
+    total = sum(r['totalWorkItems'] for r in siteResults)
+    completed = sum(r['completedWorkItems'] for r in siteResults)
+    def weightedMean(result):
+        weighted = [(r[result], r['completedWorkItems']) for r in siteResults
+                    if r['completedWorkItems'] > 0]
+        if not weighted:
+            return math.nan
+        return round(sum(value * weight for value, weight in weighted) /
+                     sum(weight for value, weight in weighted), 2)
+    return {'sites': len(siteResults),
+            'totalWorkItems': total,
+            'completedWorkItems': completed,
+            'percentageCompleted': round(completed / total * 100, 2) if total
+                                   else math.nan,
+            'meanThroughput': weightedMean('meanThroughput'),
+            'meanWaiting': weightedMean('meanWaiting')}
+
+#Simulating a network of sites (a list of parameter dictionaries) with
+#numDrivers shared drivers until horizon. Sites without a seed get one
+#spawned from seed. The sites are spread over up to workers processes, in
+#as many shards; with a parquetRoot, the monitoring data of site i are
+#written as replication i. Further keyword arguments are passed on to
+#simulationRunner (e.g. engine = 'lindley'). Returns the results of each
+#site, the statistics of the drivers and a summary of the network.
+def networkRuns(sites, numDrivers = 6, seed = None, workers = None,
+                horizon = 168, **runOptions):
+    workers = workers or os.cpu_count() or 1
+    siteSeeds = numpy.random.SeedSequence(seed).spawn(len(sites))
+    sites = [dict(params, seed = params.get('seed', siteSeed))
+             for params, siteSeed in zip(sites, siteSeeds)]
+    pickups, transport = sharedTransport(sites, numDrivers, horizon)
+    optionsPerSite = [dict(runOptions, horizon = horizon, replication = i)
+                      for i in range(len(sites))]
+    if workers == 1 or len(sites) == 1:
+        siteResults = list(map(siteRunner, sites, pickups, optionsPerSite))
+    else:
+        with concurrent.futures.ProcessPoolExecutor(
+               min(workers, len(sites))) as executor:
+            siteResults = list(executor.map(
+                            siteRunner, sites, pickups, optionsPerSite,
+                            chunksize = math.ceil(len(sites) / workers)))
+    return {'sites': siteResults,
+            'transport': transport,
+            'summary': networkSummary(siteResults)}
@@ -0,0 +1,71 @@
+import fractions
+
+############################################################################
+###  Parameters of a simulation run                                      ###
+############################################################################
+#Parameters used if the user does not provide any (one unit of time is one
+#hour; pick-up times are given as times of day):
+defaultParameters = {'averageStepDur': 15/60, #0 float
+                     'interarrivTime': 5/60, #1 float
+                     'numPharmacists': 6, #2 int
+                     'numLabellers': 6, #3 int
+                     'numDispensers': 6, #4 int
+                     'numFinCheckers': 6, #5 int
+                     'averageTranspDur': 1, #6 float
+                     'standDevOfTranspDur': 12/60, #7 float
+                     'weekdayPickup': [10, 12, 15, 17], #8 list
+                     'weekendPickup': [12]} #9 list
+
+#Further parameters, which the user is not asked for; runs without them use
+#these values (so that results of older runs remain comparable):
+optionalParameters = {'numVehicles': 6, #int, vehicles for pick-ups
+                      #list of 168 rates (prescriptions per hour, for each
+                      #hour of the week) instead of interarrivTime, see
+                      #arrivalProfiles.py:
+                      'arrivalProfile': None}
+
+#Reading a number typed by a user, which may also be a fraction such as
+#'15/60' (instead of passing it to eval):
+def parseNumber(text):
+    return float(fractions.Fraction(text.strip()))
+
+#Asking the user for the parameters of a simulation run on the command line
+#(entering nothing keeps the default):
+def getUserInput():
+  parameters = dict(defaultParameters)
+  labels = list(parameters.keys())
+  questions = ['Average duration of each step (default is 15/60): ',
+                'Average time between appearance of new prescriptions (default 5/60): ',
+                'Number of pharmacists working (default is 6): ',
+                'Number of labellers working (default is 6): ', 
+                'Number of dispensers working (default is 6): ',
+                'Number of final checkers working (default is 6): ',
+                'Average duration of transport (default is 1): ',
+                'Standard deviation of transport duration (default is 12/60): ',
+                "Pickup times during the week (default '10 12 15 17'): ",
+                "Pickup times on weekends (default '12'): "]
+  
+  print('Please provide the following parameters of the simulation run:')
+  
+  for iteration, param in enumerate(parameters):
+    answer = input(questions[iteration])
+    if iteration >= (len(parameters) - 2):
+      if answer == '':
+        continue
+      else:
+        stringList = answer.split()
+        answer = [parseNumber(i) for i in stringList]
+        parameters.update({labels[iteration]: answer})
+    else:
+      while not(str(answer).replace('.', '').isdigit() or str(answer) == ''):
+        print('Please try again. You need to enter a positive number or nothing.')
+        answer = input(questions[iteration])
+      if answer == '':
+        continue
+      else:
+        if iteration in [2, 3, 4, 5]:
+          parameters.update({labels[iteration]: int(answer)})
+        else:
+          parameters.update({labels[iteration]: float(answer)})
+      
+  return parameters
@@ -0,0 +1,36 @@
+import numpy
+
+############################################################################
+###  Prescriptions                                                       ###
+############################################################################
+#A prescription passing through the dispensary: its (unique) ID and the
+#times of its steps, carried through the store to the pick-up. With
+#__slots__, instances have no dictionary and take much less memory than
+#ordinary objects (or tuples of tuples), which matters when thousands of
+#them are waiting in the store.
+class Prescription(object):
+  __slots__ = ('id', 'arrivalTime', 'verifStarted', 'verifFinished',
+               'labelStarted', 'labelFinished', 'dispStarted', 'dispFinished',
+               'finCheckStarted', 'finCheckFinished', 'putInStore')
+  
+  def __init__(self, prescriptionId, arrivalTime):
+    self.id = prescriptionId
+    self.arrivalTime = arrivalTime
+  
+  #Waiting times for the four steps, in order:
+  def stepWaits(self):
+      return (self.verifStarted - self.arrivalTime,
+              self.labelStarted - self.verifFinished,
+              self.dispStarted - self.labelFinished,
+              self.finCheckStarted - self.dispFinished)
+
+#One array per attribute (e.g. 'arrivalTime') of a batch of prescriptions,
+#e.g. of all prescriptions taken by a pick-up:
+def prescriptionArrays(prescriptions, names):
+    count = len(prescriptions)
+    arrays = {}
+    for name in names:
+        dtype = int if name == 'id' else float
+        arrays[name] = numpy.fromiter((getattr(p, name) for p in prescriptions),
+                                      dtype, count)
+    return arrays
@@ -0,0 +1,242 @@
+import numpy
+import simpy
+
+from .prescription import Prescription, prescriptionArrays
+
+############################################################################
+###  SimPy processes                                                     ###
+############################################################################
+
+#This process describes the simplified workflow after a prescription (or
+#transcription) has been added to the dedicated IT system until its dispensed
+#medication(s) are deposited in the dispensary for collection by a driver.
+#The durations of the four steps (in hours) may be given, e.g. by a trace.
+def prescriptionProcessor(env, store, disp, prescription, durations = None):
+    prescriptionId = prescription.id
+    #Capturing parameters that are changing per simulation run:
+    disp.recorder.record(prescriptionId, 'averageStepDur',
+                         disp.averageStepDur)
+    disp.recorder.record(prescriptionId, 'interarrivTime',
+                         disp.interarrivTime)
+    #Capturing arrival time of the prescription (set by the generator):    
+    arrivalTime = prescription.arrivalTime
+    disp.stats.addArrival()
+    disp.recorder.record(prescriptionId, 'arrivalTime', arrivalTime)
+    timeOfDay = disp.timeOfDayEstablisher(arrivalTime)
+    disp.recorder.record(prescriptionId, 'timeOfDayOfArrival', timeOfDay)
+    dayOfWeek = disp.hoursToWeekdayConverter(arrivalTime)
+    disp.recorder.recordWeekday(prescriptionId, 'dayOfWeekOfArrival',
+                                dayOfWeek)
+    #The work content of the prescription (the durations of the four steps,
+    #in units of disp.averageStepDur) is drawn on arrival, so that the k-th
+    #prescription gets the k-th number of each stream, whatever the order
+    #in which prescriptions reach the later steps. Runs with the same seed
+    #thus see the same demand and work content, even if they differ in
+    #staffing or pick-up times (common random numbers):
+    if durations is None:
+        verifWork = disp.streams.verification.next()
+        labelWork = disp.streams.labelling.next()
+        dispWork = disp.streams.dispensing.next()
+        finCheckWork = disp.streams.finalCheck.next()
+    else:
+        verifWork, labelWork, dispWork, finCheckWork = \
+          [duration / disp.averageStepDur for duration in durations]
+    #Four steps are required to process a prescription. Each will take a 
+    #certain time as defined (on average) by disp.averageStepDur. Each step 
+    #also requires a different staff-group for processing as a resource. Also, 
+    #each step's duration might extend beyond the closing time for the day and 
+    #require finishing on the next day (or even the day after that) - the 
+    #disp.durationAdjuster function is meant to adjust delays accordingly.
+    #A step taken up outside opening hours (e.g. by an arrival at night, or
+    #at closing time) only starts at the next opening, which is recorded as
+    #its start (as by the Lindley engine):
+    #Step 1:
+    with disp.Pharmacists.request() as request:
+      yield request
+      timeToProcessPrescription = disp.averageStepDur * verifWork
+      overallDelay = disp.durationAdjuster(timeToProcessPrescription,
+                                            env.now)
+      #Capturing time when verifying starts:
+      prescription.verifStarted = disp.calendar.startTime(env.now)
+      disp.recorder.record(prescriptionId, 'verifStarted',
+                           prescription.verifStarted)
+      yield env.timeout(overallDelay)
+    #Capturing time when prescription is verified:
+    prescription.verifFinished = env.now
+    disp.recorder.record(prescriptionId, 'verifFinished',
+                         prescription.verifFinished)
+    #Step 2:
+    with disp.Labellers.request() as request:
+      yield request
+      timeToProcessPrescription = disp.averageStepDur * labelWork
+      overallDelay = disp.durationAdjuster(timeToProcessPrescription,
+                                            env.now)
+      #Capturing time when labelling starts:
+      prescription.labelStarted = disp.calendar.startTime(env.now)
+      disp.recorder.record(prescriptionId, 'labelStarted',
+                           prescription.labelStarted)
+      yield env.timeout(overallDelay)
+    #Capturing time when prescription is labelled:
+    prescription.labelFinished = env.now
+    disp.recorder.record(prescriptionId, 'labelFinished',
+                         prescription.labelFinished)
+    #Step 3:
+    with disp.Dispensers.request() as request:
+      yield request
+      timeToProcessPrescription = disp.averageStepDur * dispWork
+      overallDelay = disp.durationAdjuster(timeToProcessPrescription,
+                                            env.now)
+      #Capturing time when dispensing starts:
+      prescription.dispStarted = disp.calendar.startTime(env.now)
+      disp.recorder.record(prescriptionId, 'dispStarted',
+                           prescription.dispStarted)
+      yield env.timeout(overallDelay)
+    #Capturing time when prescription is dispensed:
+    prescription.dispFinished = env.now
+    disp.recorder.record(prescriptionId, 'dispFinished',
+                         prescription.dispFinished)
+    #Step 4:
+    with disp.FinalCheckers.request() as request:
+      yield request
+      timeToProcessPrescription = disp.averageStepDur * finCheckWork
+      overallDelay = disp.durationAdjuster(timeToProcessPrescription,
+                                            env.now)
+      #Capturing time when final checking starts:
+      prescription.finCheckStarted = disp.calendar.startTime(env.now)
+      disp.recorder.record(prescriptionId, 'finCheckStarted',
+                           prescription.finCheckStarted)
+      yield env.timeout(overallDelay)
+    #Capturing time when prescription is final checked:
+    prescription.finCheckFinished = env.now
+    disp.recorder.record(prescriptionId, 'finCheckFinished',
+                         prescription.finCheckFinished)
+    #Putting dispensed items into a store before transport (the prescription
+    #carries what is needed for the statistics on pick-up and delivery).
+    #Capturing when dispensed items are put into the store. This should be the 
+    #same as finCheckFinished (unless there is an error). 
+    prescription.putInStore = env.now
+    yield store.put(prescription)
+    putInStore = prescription.putInStore
+    disp.recorder.record(prescriptionId, 'putInStore', putInStore)
+    timeOfDayOfPutInStore = disp.timeOfDayEstablisher(putInStore)
+    disp.recorder.record(prescriptionId, 'timeOfDayOfPutInStore',
+                         timeOfDayOfPutInStore)
+    dayOfWeekOfPutInStore = disp.hoursToWeekdayConverter(putInStore)
+    disp.recorder.recordWeekday(prescriptionId, 'dayOfWeekOfPutInStore',
+                                dayOfWeekOfPutInStore)
+    
+##Transporting dispensed items to wards/units at defined times
+##during the day. A single dispatcher goes through the pick-up times; at
+##each of them, a vehicle takes everything waiting in the store at once
+##(one event, however many items there are). There are disp.numVehicles
+##vehicles; if all of them are still on their way to the units, the
+##pick-up waits until the first one has delivered its prescriptions.
+##(The pick-up times may be changed during a run, see fork.py; the
+##dispatcher is then interrupted while waiting for the next one.)
+def pickupDispatcher(env, store, disp):
+    while True:
+        pickupTime = next(disp.transportTimes)
+        if pickupTime > env.now:
+            try:
+                yield env.timeout(pickupTime - env.now)
+            except simpy.Interrupt:
+                continue
+        vehicle = disp.Vehicles.request()
+        yield vehicle
+        batch = yield from pickup(env, store, disp)
+        #Prompting the delivery of picked up prescriptions to the units (the
+        #dispatcher does not wait for it):
+        env.process(transportToUnits(env, batch['id'], batch['arrivalTime'],
+                                     disp, vehicle))
+
+##Pick-ups of a dispensary in a network (see network.py): the times of the
+##pick-ups and the durations of the trips are given, as the drivers are
+##shared with the other dispensaries of the network.
+def networkDispatcher(env, store, disp, pickups):
+    for pickupTime, transportDuration in pickups:
+        yield env.timeout(pickupTime - env.now)
+        batch = yield from pickup(env, store, disp)
+        env.process(transportToUnits(env, batch['id'], batch['arrivalTime'],
+                                     disp, None, transportDuration))
+
+#Taking everything waiting in the store (used with 'yield from' by the
+#dispatchers above); returns the IDs, arrival times and times of putting
+#into the store of the prescriptions picked up:
+def pickup(env, store, disp):
+    i = len(disp.pickupRecorder)
+    #Documenting data on each pick-up time:
+    disp.pickupRecorder.record(i, 'timeBeforePickup', env.now)
+    disp.pickupRecorder.record(i, 'itemsInStoreBefore', len(store.items))
+    #All items in store at this time get removed from the store:
+    items = yield store.getAll()
+    batch = prescriptionArrays(items, ['id', 'arrivalTime', 'putInStore'])
+    if items:
+        disp.recorder.recordColumn(batch['id'], 'timeOfPickup', env.now)
+        stepWaits = numpy.array([p.stepWaits() for p in items])
+        waits = dict(zip(disp.stats.waitingTimes[:4], stepWaits.T))
+        waits['waitingForTransp'] = env.now - batch['putInStore']
+        disp.stats.addPickups(waits)
+    #The next two entries to the dataframe are just to monitor that the
+    #store gets emptied at each pick-up:
+    disp.pickupRecorder.record(i, 'timeAfterPickup', env.now)
+    disp.pickupRecorder.record(i, 'itemsInStoreAfter', len(store.items))
+    return batch
+
+def transportToUnits(env, prescriptionIds, arrivalTimes, disp, vehicle,
+                     transportDuration = None):
+    #A normal distribution of delivery times is assumed (the k-th trip gets
+    #the k-th number of the stream; trips carry whole batches, so transport
+    #times are common to runs per trip rather than per prescription), unless
+    #the duration is given (by a network):
+    if transportDuration is None:
+        transportDuration = disp.streams.transport.normal(
+                              disp.averageTranspDur, disp.standDevOfTranspDur)
+    yield env.timeout(transportDuration)
+    #Documentation of all received prescriptions in the monitoring dataframe:
+    disp.recorder.recordColumn(prescriptionIds, 'timeOfDelivery', env.now)
+    disp.stats.addDeliveries(env.now - arrivalTimes)
+    #The vehicle is available for another pick-up:
+    if vehicle is not None:
+        disp.Vehicles.release(vehicle)
+
+#Generating prescription items when dispensary is open, i.e.
+#depending on the opening times on weekdays and weekends. The
+#average processing time for prescriptions and the mean
+#interarrival time are also taken from the disp object.
+def prescriptionGenerator(env, store, disp):
+    while True:
+        yield env.timeout(next(disp.shiftTimes) - env.now)
+        nextTime = next(disp.shiftTimes)
+        if disp.arrivalProfile is not None:
+            #arrivals changing over the week, drawn for the whole shift at
+            #once (see arrivalProfiles.py):
+            arrivalTimes = disp.arrivalProfile.arrivalsBetween(
+                             env.now, nextTime, disp.streams.arrivals)
+            for arrivalTime in arrivalTimes.tolist():
+                yield env.timeout(arrivalTime - env.now)
+                prescription = Prescription(next(disp.prescriptionIds),
+                                            env.now)
+                env.process(prescriptionProcessor(env, store, disp,
+                                                  prescription))
+            continue
+        while env.now <= nextTime:
+            #(IDs are unique over the whole run, see Dispensary)
+            prescription = Prescription(next(disp.prescriptionIds), env.now)
+            env.process(prescriptionProcessor(env, store, disp, prescription))  
+            yield env.timeout(
+                    disp.streams.arrivals.exponential(disp.interarrivTime))
+
+#Replaying the arrivals of a trace instead (see traces.py); chunks are the
+#chunks of the trace, which are only read when the simulation gets to them.
+def traceGenerator(env, store, disp, chunks):
+    for arrivalTimes, durations in chunks:
+        if durations is None:
+            durations = [None] * len(arrivalTimes)
+        else:
+            durations = durations.tolist()
+        for arrivalTime, prescriptionDurations in zip(arrivalTimes.tolist(),
+                                                      durations):
+            yield env.timeout(max(arrivalTime - env.now, 0))
+            prescription = Prescription(next(disp.prescriptionIds), env.now)
+            env.process(prescriptionProcessor(env, store, disp, prescription,
+                                              prescriptionDurations))
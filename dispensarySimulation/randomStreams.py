@@ -0,0 +1,80 @@
+import numpy
+
+############################################################################
+### Random numbers                                                       ###
+############################################################################
+#Drawing random numbers one at a time from NumPy carries a considerable
+#overhead per call. A stream below draws a whole block of (standard) random
+#numbers at once and hands them out one after the other, drawing the next
+#block once the current one is used up.
+#An antithetic stream gives the 'mirror image' of each number of the plain
+#stream with the same generator: if the plain stream gives a number from
+#the lower end of its distribution, the antithetic one gives the matching
+#number from the upper end (i.e. the number for 1 - u instead of u, where
+#u is the uniformly distributed number behind it).
+class BufferedStream(object):
+  def __init__(self, generator, distribution, blockSize = 4096,
+               antithetic = False):
+    self.generator = generator
+    #name of the generator method, e.g. 'standard_exponential':
+    self.distribution = distribution
+    self.blockSize = blockSize
+    self.antithetic = antithetic
+    self.values = iter(())
+  
+  def next(self):
+      try:
+          return next(self.values)
+      except StopIteration:
+          self.values = iter(self.draw(self.blockSize).tolist())
+          return next(self.values)
+  
+  #The next size numbers of the generator as an array (bypassing the
+  #buffer, e.g. for the fast engine):
+  def draw(self, size):
+      block = getattr(self.generator, self.distribution)(size)
+      if not self.antithetic:
+          return block
+      if self.distribution == 'standard_normal':
+          return -block
+      #standard exponential: u = exp(-x), so the mirror image is
+      #-log(1 - exp(-x)):
+      return -numpy.log(-numpy.expm1(-block))
+  
+  #For streams of standard exponentially distributed numbers:
+  def exponential(self, scale):
+      return scale * self.next()
+  
+  #For streams of standard normally distributed numbers:
+  def normal(self, loc, scale):
+      return loc + scale * self.next()
+
+#Each use of random numbers in the model gets its own stream (with its own
+#generator), so that e.g. changing the number of transports does not shift
+#the durations drawn for the steps. All generators are derived from one
+#seed; without a seed, fresh entropy is taken from the operating system.
+#With antithetic = True, all streams are antithetic (see BufferedStream):
+#a run with the same seed is then the mirror image of the plain one.
+class RandomStreams(object):
+  distributions = {'arrivals': 'standard_exponential',
+                   'verification': 'standard_exponential',
+                   'labelling': 'standard_exponential',
+                   'dispensing': 'standard_exponential',
+                   'finalCheck': 'standard_exponential',
+                   'transport': 'standard_normal'}
+  
+  def __init__(self, seed = None, blockSize = 4096, antithetic = False):
+    self.antithetic = antithetic
+    if isinstance(seed, numpy.random.SeedSequence):
+        self.seedSequence = seed
+    else:
+        self.seedSequence = numpy.random.SeedSequence(seed)
+    for i, (name, distribution) in enumerate(self.distributions.items()):
+        #equivalent to self.seedSequence.spawn(), but does not depend on
+        #how often the seed sequence has been spawned from before:
+        childSequence = numpy.random.SeedSequence(
+                          self.seedSequence.entropy,
+                          spawn_key = self.seedSequence.spawn_key + (i,))
+        generator = numpy.random.default_rng(childSequence)
+        setattr(self, name, BufferedStream(generator, distribution, blockSize,
+                                           antithetic))
@@ -0,0 +1,111 @@
+import numpy
+
+############################################################################
+### Recording of monitoring data                                         ###
+############################################################################
+#Writing single cells into a pandas data-frame (via .loc) grows the data-frame
+#one row and one cell at a time, with object dtype, which is very slow. The
+#recorder below keeps one typed NumPy array per column instead, indexed 
+#directly by an integer row ID (e.g. the number of a prescription). All arrays
+#double their capacity whenever a row ID beyond the current capacity is
+#written. Names of weekdays are stored as small integer codes. The data-frame
+#is only built once, at the end of a simulation run.
+class MonitoringRecorder(object):
+  def __init__(self, columns, weekdayColumns, namesOfWeekdays,
+               initialCapacity = 1024):
+    self.columns = columns
+    self.weekdayColumns = weekdayColumns
+    self.namesOfWeekdays = namesOfWeekdays
+    self.weekdayCodes = {name: code for code, name
+                         in enumerate(namesOfWeekdays)}
+    self.capacity = initialCapacity
+    #one more than the highest row ID written so far:
+    self.size = 0
+    self.arrays = {}
+    for column in columns:
+        if column in weekdayColumns:
+            #-1 stands for 'not recorded (yet)':
+            self.arrays[column] = numpy.full(initialCapacity, -1,
+                                             dtype = numpy.int8)
+        else:
+            self.arrays[column] = numpy.full(initialCapacity, numpy.nan)
+  
+  def __len__(self):
+      return self.size
+  
+  #Enlarging all arrays (at least doubling their capacity), so that a row
+  #with the given ID fits in:
+  def grow(self, rowId):
+      newCapacity = max(2 * self.capacity, rowId + 1)
+      for column, values in self.arrays.items():
+          if column in self.weekdayColumns:
+              grown = numpy.full(newCapacity, -1, dtype = numpy.int8)
+          else:
+              grown = numpy.full(newCapacity, numpy.nan)
+          grown[:self.capacity] = values
+          self.arrays[column] = grown
+      self.capacity = newCapacity
+  
+  #Storing a single (numeric) value:
+  def record(self, rowId, column, value):
+      if rowId >= self.capacity:
+          self.grow(rowId)
+      self.arrays[column][rowId] = value
+      if rowId >= self.size:
+          self.size = rowId + 1
+  
+  #Storing the name of a weekday (as its integer code):
+  def recordWeekday(self, rowId, column, nameOfWeekday):
+      self.record(rowId, column, self.weekdayCodes[nameOfWeekday])
+  
+  #Storing many values (or weekday codes) of one column at once:
+  def recordColumn(self, rowIds, column, values):
+      if len(rowIds) == 0:
+          return
+      highestRowId = int(numpy.max(rowIds))
+      if highestRowId >= self.capacity:
+          self.grow(highestRowId)
+      self.arrays[column][rowIds] = values
+      if highestRowId >= self.size:
+          self.size = highestRowId + 1
+  
+  #Building a data-frame with one row per row ID for which at least one
+  #value has been recorded; values not recorded are NaN (or None for names
+  #of weekdays):
+  def toDataFrame(self):
+      import pandas
+      size = self.size
+      recorded = numpy.zeros(size, dtype = bool)
+      for column, values in self.arrays.items():
+          if column in self.weekdayColumns:
+              recorded |= values[:size] >= 0
+          else:
+              recorded |= ~numpy.isnan(values[:size])
+      rowIds = numpy.flatnonzero(recorded)
+      #code -1 picks the trailing None:
+      names = numpy.array(self.namesOfWeekdays + [None], dtype = object)
+      data = {}
+      for column in self.columns:
+          values = self.arrays[column][rowIds]
+          if column in self.weekdayColumns:
+              data[column] = names[values]
+          else:
+              data[column] = values
+      return pandas.DataFrame(data, index = rowIds, columns = self.columns)
+
+#Standing in for a MonitoringRecorder when no rows are to be kept:
+class NullRecorder(object):
+  def __len__(self):
+      return 0
+  
+  def record(self, rowId, column, value):
+      pass
+  
+  def recordWeekday(self, rowId, column, nameOfWeekday):
+      pass
+  
+  def recordColumn(self, rowIds, column, values):
+      pass
+  
+  def toDataFrame(self):
+      return None
@@ -0,0 +1,212 @@
+import concurrent.futures
+import math
+import os
+import statistics
+import numpy
+
+from .runner import simulationRunner
+from .confidence import confidenceInterval, tQuantile
+
+############################################################################
+###  Replications                                                        ###
+############################################################################
+
+#Running a single replication in a worker process; nothing is saved to disk.
+#runOptions are further keyword arguments of simulationRunner (e.g. engine
+#or horizon). Replications cannot be profiled into a profilePath, as they
+#would all overwrite the same file:
+def replicationRunner(parametersByUser, runOptions):
+    if runOptions.get('profilePath') is not None:
+        raise ValueError('profilePath is for single runs, not replications')
+    return simulationRunner(parametersByUser, outputPath = None, **runOptions)
+
+#Running n replications of a simulation run with the given parameters, 
+#spread over worker processes. Each replication gets its own seed; unless 
+#a list of seeds is given, these are spawned from params['seed'] (if there
+#is any), so that all replications are independent and the whole set is
+#reproducible. Returns the results of each replication as well as mean and
+#confidence interval of the main results. Further keyword arguments are
+#passed on to simulationRunner (e.g. engine = 'lindley', horizon = 672).
+#With antithetic = True, each seed gives a pair of runs, a plain and an
+#antithetic one (see RandomStreams), i.e. 2n runs; the summary is based on
+#the means of the pairs, which vary less than single runs if the results
+#depend monotonically on the random numbers (as throughput and waiting
+#times do on the durations).
+def runReplications(params, n, seeds = None, workers = None,
+                    confidence = 0.95, antithetic = False, **runOptions):
+    if seeds is None:
+        seeds = numpy.random.SeedSequence(params.get('seed')).spawn(n)
+    elif len(seeds) != n:
+        raise ValueError(f'{len(seeds)} seeds given for {n} replications')
+    if workers == 1:
+        replications = runBatch(None, params, seeds, runOptions,
+                                antithetic = antithetic)
+    else:
+        with concurrent.futures.ProcessPoolExecutor(workers) as executor:
+            replications = runBatch(executor, params, seeds, runOptions,
+                                    antithetic = antithetic)
+    return {'replications': replications,
+            'summary': summarise(observations(replications, summaryResults,
+                                              antithetic),
+                                 summaryResults, confidence)}
+
+#Results summarised over replications (by mean and confidence interval):
+summaryResults = ['meanThroughput', 'meanWaiting', 'percentageCompleted']
+
+def summarise(replications, results, confidence):
+    return {result: confidenceInterval([r[result] for r in replications],
+                                       confidence)
+            for result in results}
+
+#Independent observations of the results: the replications themselves, or
+#with antithetic runs, the means of each pair (plain and antithetic run):
+def observations(replications, results, antithetic = False):
+    if not antithetic:
+        return replications
+    return [{result: (plain[result] + mirrored[result]) / 2
+             for result in results}
+            for plain, mirrored in zip(replications[0::2], replications[1::2])]
+
+#Running one replication per seed (in the worker processes of executor,
+#unless it is None), or with antithetic = True a plain and an antithetic
+#one per seed (one after the other); the replications are numbered from
+#firstReplication:
+def runBatch(executor, params, seeds, runOptions, firstReplication = 0,
+             antithetic = False):
+    #each replication gets its own copy of the parameters (simulationRunner
+    #adds its results to the dictionary it is given):
+    if antithetic:
+        parametersPerReplication = [dict(params, seed = seed, **mirrored)
+                                    for seed in seeds
+                                    for mirrored in [{}, {'antithetic': True}]]
+    else:
+        parametersPerReplication = [dict(params, seed = seed)
+                                    for seed in seeds]
+    optionsPerReplication = [dict(runOptions, replication = r)
+                             for r in range(firstReplication,
+                                            firstReplication +
+                                            len(parametersPerReplication))]
+    if executor is None:
+        return list(map(replicationRunner, parametersPerReplication,
+                        optionsPerReplication))
+    return list(executor.map(replicationRunner, parametersPerReplication,
+                             optionsPerReplication))
+
+#Estimated number of replications for a confidence interval with the given
+#half-width (from the standard deviation of the replications so far; with
+#many replications, the t-distribution is close to the normal one):
+def replicationsNeeded(interval, halfWidth, confidence):
+    n = interval['n']
+    if not n > 1 or math.isnan(interval['halfWidth']):
+        return n + 1
+    standardDeviation = interval['halfWidth'] * math.sqrt(n) / \
+                        tQuantile(0.5 + confidence / 2, n - 1)
+    z = statistics.NormalDist().inv_cdf(0.5 + confidence / 2)
+    return math.ceil((z * standardDeviation / halfWidth)**2)
+
+#Running replications in batches until the confidence interval of each 
+#result in targets is at most as wide as given there (as half-width), e.g.
+#runUntilPrecise(params, {'meanThroughput': 0.1}) for +-0.1 hours on the
+#mean throughput time, or until maxReplications have been run. After each
+#batch, the number of replications still needed is estimated from the
+#standard deviations so far (see replicationsNeeded); batches are rounded
+#up to whole multiples of the number of workers, which are kept busy. The
+#seeds are spawned from params['seed'] as in runReplications, so the first
+#n replications are the same as those of runReplications(params, n).
+#Returns the replications, their summary, whether the targets have been met
+#and the half-widths after each batch.
+def runUntilPrecise(params, targets, confidence = 0.95, minReplications = 4,
+                    maxReplications = 200, workers = None, **runOptions):
+    workers = workers or os.cpu_count() or 1
+    root = numpy.random.SeedSequence(params.get('seed'))
+    replications = []
+    batches = []
+    batchSize = min(max(minReplications, workers), maxReplications)
+    if workers == 1:
+        executor = None
+    else:
+        executor = concurrent.futures.ProcessPoolExecutor(workers)
+    try:
+        while True:
+            replications += runBatch(executor, params, root.spawn(batchSize),
+                                     runOptions, len(replications))
+            n = len(replications)
+            summary = summarise(replications, targets, confidence)
+            halfWidths = {result: summary[result]['halfWidth']
+                          for result in targets}
+            batches.append({'replications': n, 'halfWidths': halfWidths})
+            precise = all(halfWidths[result] <= target
+                          for result, target in targets.items())
+            if precise or n >= maxReplications:
+                break
+            needed = n + 1
+            for result, target in targets.items():
+                if not halfWidths[result] <= target:
+                    needed = max(needed, replicationsNeeded(
+                               summary[result], target, confidence))
+            #(at most doubling the replications, as the estimate is rough
+            #after a few replications)
+            batchSize = min(needed - n, n)
+            batchSize = math.ceil(batchSize / workers) * workers
+            batchSize = min(batchSize, maxReplications - n)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    summary.update(summarise(replications, summaryResults, confidence))
+    return {'replications': replications,
+            'summary': summary,
+            'precise': precise,
+            'batches': batches}
+
+#Comparing two scenarios (e.g. four against two pick-ups per weekday) with
+#common random numbers: both are run with the same n seeds, so that paired
+#runs see the same arrivals and work content (see prescriptionProcessor),
+#and the confidence intervals of the differences (other - base) are based
+#on the differences of the pairs. The more the results of paired runs are
+#correlated, the narrower these intervals are compared with independent
+#runs; varianceRatio is the variance of the paired differences divided by
+#that of independent ones, i.e. roughly the share of the replications
+#independent runs would need for the same precision. antithetic = True
+#adds antithetic runs to each seed (see runReplications).
+def compareScenarios(baseParams, otherParams, n, seeds = None,
+                     workers = None, confidence = 0.95, antithetic = False,
+                     results = summaryResults, **runOptions):
+    if seeds is None:
+        seeds = numpy.random.SeedSequence(baseParams.get('seed')).spawn(n)
+    elif len(seeds) != n:
+        raise ValueError(f'{len(seeds)} seeds given for {n} replications')
+    if workers == 1:
+        executor = None
+    else:
+        executor = concurrent.futures.ProcessPoolExecutor(workers)
+    try:
+        baseRuns = runBatch(executor, baseParams, seeds, runOptions,
+                            antithetic = antithetic)
+        otherRuns = runBatch(executor, otherParams, seeds, runOptions,
+                             antithetic = antithetic)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    base = observations(baseRuns, results, antithetic)
+    other = observations(otherRuns, results, antithetic)
+    difference = {}
+    varianceRatio = {}
+    for result in results:
+        pairs = [(b[result], o[result]) for b, o in zip(base, other)
+                 if not (math.isnan(b[result]) or math.isnan(o[result]))]
+        differences = [o - b for b, o in pairs]
+        difference[result] = confidenceInterval(differences, confidence)
+        if len(pairs) > 1:
+            independent = statistics.variance([b for b, o in pairs]) + \
+                          statistics.variance([o for b, o in pairs])
+            varianceRatio[result] = statistics.variance(differences) / \
+                                    independent if independent > 0 \
+                                    else math.nan
+        else:
+            varianceRatio[result] = math.nan
+    return {'base': baseRuns,
+            'other': otherRuns,
+            'summary': {'base': summarise(base, results, confidence),
+                        'other': summarise(other, results, confidence),
+                        'difference': difference,
+                        'varianceRatio': varianceRatio}}
@@ -0,0 +1,266 @@
+import math
+import simpy
+from simpy.core import BoundClass
+from simpy.resources.store import StoreGet
+
+############################################################################
+###  SimPy resources                                                     ###
+############################################################################
+
+#Conversion of time-points into open hours (see ShiftCalendar), shared by
+#all levels of a run: many levels change at the same time-point, for which
+#the open hours are only calculated once.
+class OpenHoursClock(object):
+  def __init__(self, calendar):
+    self.calendar = calendar
+    self.lastTime = 0
+    self.lastOpenHours = 0
+  
+  def openHours(self, now):
+      if now != self.lastTime:
+          self.lastTime = now
+          self.lastOpenHours = self.calendar.openHoursUntil(now)
+      return self.lastOpenHours
+
+#Time-weighted integral of a level (e.g. the number of busy staff or the
+#length of a queue), updated only when the level changes (update must only
+#be called with a new level), i.e. at O(1) cost per event and without any
+#polling. The integral is taken over open hours, so that the means are
+#means over the time when the dispensary is open; it is kept per shift.
+#For a time series, the level is averaged (over all hours) within intervals
+#of sampleInterval hours. Only the current shift and the current interval
+#are added to until time moves beyond them.
+class TimeWeightedLevel(object):
+  def __init__(self, clock, sampleInterval = 1):
+    self.clock = clock
+    self.sampleInterval = sampleInterval
+    self.level = 0
+    self.lastTime = 0
+    self.lastOpenHours = 0
+    self.integralPerShift = {}
+    self.maxPerShift = {}
+    self.samples = {}
+    self.shift, self.shiftEnd = clock.calendar.shiftOfOpenHours(0)
+    self.shiftArea = 0
+    self.shiftMax = 0
+    self.sample = 0
+    self.sampleEnd = sampleInterval
+    self.sampleArea = 0
+  
+  def update(self, now, level):
+      if now != self.lastTime:
+          self.accumulate(now)
+      self.level = level
+      if level > self.shiftMax:
+          self.shiftMax = level
+  
+  #Adding the current level from the last change until now:
+  def accumulate(self, now):
+      level = self.level
+      openHours = self.clock.openHours(now)
+      if openHours < self.shiftEnd:
+          self.shiftArea += level * (openHours - self.lastOpenHours)
+      else:
+          self.nextShifts(level, openHours)
+      if now < self.sampleEnd:
+          self.sampleArea += level * (now - self.lastTime)
+      else:
+          self.nextSamples(level, now)
+      self.lastTime = now
+      self.lastOpenHours = openHours
+  
+  #(moving on to the shift of the given open hours)
+  def nextShifts(self, level, openHours):
+      start = self.lastOpenHours
+      while openHours >= self.shiftEnd:
+          self.shiftArea += level * (self.shiftEnd - start)
+          self.integralPerShift[self.shift] = self.shiftArea
+          self.maxPerShift[self.shift] = self.shiftMax
+          start = self.shiftEnd
+          self.shift, self.shiftEnd = \
+            self.clock.calendar.shiftOfOpenHours(self.shiftEnd)
+          self.shiftArea = 0
+          self.shiftMax = level
+      self.shiftArea += level * (openHours - start)
+  
+  #(moving on to the interval of the time series containing now)
+  def nextSamples(self, level, now):
+      start = self.lastTime
+      while now >= self.sampleEnd:
+          self.sampleArea += level * (self.sampleEnd - start)
+          if self.sampleArea:
+              self.samples[self.sample] = self.sampleArea
+          start = self.sampleEnd
+          self.sample += 1
+          self.sampleEnd += self.sampleInterval
+          self.sampleArea = 0
+      self.sampleArea += level * (now - start)
+  
+  #Bringing the integrals up to date (at the end of a run); the current
+  #shift and interval are included as far as they have passed:
+  def close(self, now):
+      if now != self.lastTime:
+          self.accumulate(now)
+      self.integralPerShift[self.shift] = self.shiftArea
+      self.maxPerShift[self.shift] = self.shiftMax
+      self.samples[self.sample] = self.sampleArea
+  
+  def integral(self):
+      return sum(self.integralPerShift.values())
+  
+  def maxLevel(self):
+      return max(self.maxPerShift.values())
+  
+  #Mean level per interval of the time series, up to the given time:
+  def series(self, until):
+      count = int(-(-until // self.sampleInterval))
+      return [self.samples.get(sample, 0) / self.sampleInterval
+              for sample in range(count)]
+
+#A resource (i.e. a group of staff) monitoring the number of busy staff and
+#the length of its queue. SimPy calls _trigger_put after every request and
+#_trigger_get after every release (and both again once these have been
+#processed), so the levels are checked there; most calls change nothing,
+#which is checked before calling update:
+class MonitoredResource(simpy.Resource):
+  def __init__(self, env, capacity, clock):
+    super().__init__(env, capacity)
+    self.busy = TimeWeightedLevel(clock)
+    self.queueLength = TimeWeightedLevel(clock)
+  
+  def _trigger_put(self, getEvent):
+      super()._trigger_put(getEvent)
+      if len(self.users) != self.busy.level:
+          self.busy.update(self._env.now, len(self.users))
+      if len(self.put_queue) != self.queueLength.level:
+          self.queueLength.update(self._env.now, len(self.put_queue))
+  
+  def _trigger_get(self, putEvent):
+      super()._trigger_get(putEvent)
+      if len(self.users) != self.busy.level:
+          self.busy.update(self._env.now, len(self.users))
+      if len(self.put_queue) != self.queueLength.level:
+          self.queueLength.update(self._env.now, len(self.put_queue))
+  
+  #Changing the number of staff during a run (with fewer staff, those
+  #still busy finish their current prescription):
+  def setCapacity(self, capacity):
+      self._capacity = capacity
+      self._trigger_put(None)
+  
+  def close(self):
+      self.busy.close(self._env.now)
+      self.queueLength.close(self._env.now)
+
+#Request to take everything out of a store at once; it succeeds immediately
+#(with an empty list, if the store is empty):
+class StoreGetAll(StoreGet):
+  pass
+
+#A store from which a pick-up can take all waiting items as one event (a
+#plain simpy.Store needs one get event per item):
+class BulkStore(simpy.Store):
+  getAll = BoundClass(StoreGetAll)
+  
+  def _do_get(self, event):
+      if isinstance(event, StoreGetAll):
+          items = self.items
+          self.items = []
+          event.succeed(items)
+          return None
+      return super()._do_get(event)
+
+#The same store, monitoring how many items are waiting in it:
+class MonitoredStore(BulkStore):
+  def __init__(self, env, capacity, clock):
+    super().__init__(env, capacity)
+    self.occupancy = TimeWeightedLevel(clock)
+  
+  def _trigger_put(self, getEvent):
+      super()._trigger_put(getEvent)
+      if len(self.items) != self.occupancy.level:
+          self.occupancy.update(self._env.now, len(self.items))
+  
+  def _trigger_get(self, putEvent):
+      super()._trigger_get(putEvent)
+      if len(self.items) != self.occupancy.level:
+          self.occupancy.update(self._env.now, len(self.items))
+  
+  def close(self):
+      self.occupancy.close(self._env.now)
+
+#Utilization and queue lengths of the staff groups and the vehicles, and
+#the number of items waiting in the store, at the end of a run (until):
+#- a summary over the whole run (means over open hours; NaN if the run
+#  ended before the first opening),
+#- a data-frame with one row per shift and stage,
+#- a data-frame with the time series of the levels (means per hour).
+#The data-frames are only built with frames = True (otherwise they are
+#None, and pandas is not imported).
+def stageMonitoring(disp, store, until, frames = True):
+    calendar = disp.calendar
+    openHours = calendar.openHoursUntil(until)
+    stages = {name: getattr(disp, name) for name in
+              ['Pharmacists', 'Labellers', 'Dispensers', 'FinalCheckers',
+               'Vehicles']}
+    for resource in stages.values():
+        resource.close()
+    store.close()
+    
+    def perOpenHour(integral):
+        return integral / openHours if openHours > 0 else math.nan
+    
+    summary = {}
+    for name, resource in stages.items():
+        summary[name] = {'utilization': perOpenHour(resource.busy.integral()
+                                                    / resource.capacity),
+                         'meanQueueLength': perOpenHour(
+                                              resource.queueLength.integral()),
+                         'maxQueueLength': resource.queueLength.maxLevel()}
+    summary['store'] = {'meanQueueLength': perOpenHour(
+                                             store.occupancy.integral()),
+                        'maxQueueLength': store.occupancy.maxLevel()}
+    if not frames:
+        return summary, None, None
+    
+    import pandas
+    series = {}
+    for name, resource in stages.items():
+        series[name + 'Busy'] = resource.busy.series(until)
+        series[name + 'Queue'] = resource.queueLength.series(until)
+    series['storeItems'] = store.occupancy.series(until)
+    
+    #Shifts (with their open hours) up to the end of the run:
+    shiftRows = []
+    lastShift, shiftEnd = calendar.shiftOfOpenHours(openHours)
+    for shift in range(lastShift + 1):
+        weeks, day = divmod(shift, len(calendar.namesOfWeekdays))
+        shiftStart = weeks * calendar.openHoursPerWeek + \
+                     calendar.openHoursBeforeShift[day]
+        shiftLength = min(calendar.shiftEnds[day] - calendar.shiftStarts[day],
+                          openHours - shiftStart)
+        if shiftLength <= 0:
+            continue
+        for name, resource in list(stages.items()) + [('store', store)]:
+            if name == 'store':
+                busy = None
+                queueLength = store.occupancy
+            else:
+                busy = resource.busy
+                queueLength = resource.queueLength
+            shiftRows.append(
+              {'shift': shift,
+               'dayOfWeek': calendar.namesOfWeekdays[day],
+               'stage': name,
+               'utilization': None if busy is None else
+                              busy.integralPerShift.get(shift, 0)
+                              / (resource.capacity * shiftLength),
+               'meanQueueLength': queueLength.integralPerShift.get(shift, 0)
+                                  / shiftLength,
+               'maxQueueLength': queueLength.maxPerShift.get(shift, 0)})
+    shiftData = pandas.DataFrame(shiftRows)
+    levelSeries = pandas.DataFrame(series)
+    levelSeries.index = levelSeries.index * stages['Pharmacists'].busy. \
+                                           sampleInterval
+    levelSeries.index.name = 'time'
+    return summary, shiftData, levelSeries
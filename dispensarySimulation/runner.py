@@ -0,0 +1,212 @@
+import math
+import simpy
+
+from .dispensary import Dispensary
+from .processes import prescriptionGenerator, pickupDispatcher
+from .processes import networkDispatcher, traceGenerator
+from .resources import MonitoredStore, stageMonitoring
+from .fastEngine import lindleyEngine
+from .streamingStatistics import steadyStateResults
+from .columnarOutput import writeParquet
+from .scenarios import scenarioKey
+from .parameters import defaultParameters, optionalParameters
+from .instrumentation import Instrumentation, profiledCall
+from .traces import traceChunks
+
+#Names of the parameters (the key of the scenario is taken over these):
+parameterNames = list(defaultParameters) + list(optionalParameters)
+
+############################################################################
+###  Simulation runs                                                     ###
+############################################################################
+#The monitoring data-frame is saved to outputPath as a .csv file (pass None
+#to skip saving it, e.g. when running many replications in parallel). The
+#engine is either 'simpy' (the discrete-event simulation in processes.py)
+#or 'lindley' (the much faster calculation in fastEngine.py, for the same
+#process).
+#With keepRows = False, no monitoring data-frame is built (and memory does
+#not grow with the simulated time); the results are then taken from the
+#streaming statistics alone. The run lasts for horizon hours (168 hours are
+#one week). With steadyState = True, the warm-up period is detected and
+#steady-state results with a batch-means confidence interval are added
+#(this is meant for long horizons, e.g. several months). If parquetRoot is
+#given, the monitoring data are also written there as Parquet files, in
+#the partition of the given replication (which must then be given, so that
+#runs of one scenario do not overwrite each other). With the SimPy engine,
+#these include utilization and queue lengths of each stage per shift and as
+#hourly time series (see columnarOutput.py), e.g. loadParquet(parquetRoot,
+#'shifts'). A SimPy environment to run the simulation in (e.g. one
+#counting its events, see benchmark.py) may be passed as env. With
+#instrument = True, a report on where the time of the run goes is added to
+#the results (see instrumentation.py); with a profilePath, the run is also
+#profiled with cProfile and the statistics are dumped to that file. For a
+#dispensary in a network (see network.py), pickups gives the times of its
+#pick-ups and the durations of their trips, as pairs, instead of its own
+#vehicles. With a trace (the path of a .csv or .npy file, see traces.py),
+#the arrivals (and possibly the durations of the steps) are replayed from
+#it. With breakdowns = True (and keepRows), tables of waiting and
+#throughput times by hour of arrival and by pick-up are added, as lists of
+#rows (dictionaries) per grouping (see breakdownTables in analytics.py);
+#with breakdowns = 'statistics', the statistics behind them are added
+#instead, to be merged over replications. An observer is called with rolling KPIs every
+#observeInterval simulated hours (SimPy engine only, see live.py); if it
+#stops the run early, the results cover the run until then, and the time
+#is added to them as stoppedAt.
+def simulationRunner(parametersByUser, outputPath = 'monitoringDf.csv',
+                     engine = 'simpy', keepRows = True, horizon = 168,
+                     steadyState = False, parquetRoot = None,
+                     replication = None, env = None, instrument = False,
+                     profilePath = None, pickups = None, trace = None,
+                     breakdowns = False, observer = None,
+                     observeInterval = 24): 
+    #(the results are added to parametersByUser further below, so only the
+    #parameters themselves make up the scenario)
+    if observer is not None and not observeInterval > 0:
+        raise ValueError('observeInterval must be a positive number of hours')
+    scenario = None
+    if parquetRoot is not None:
+        if replication is None:
+            raise ValueError('writing to a parquetRoot needs the number of '
+                             'the replication')
+        scenario = scenarioKey({name: value for name, value
+                                in parametersByUser.items()
+                                if name in parameterNames})
+    if env is None:
+        env = simpy.Environment()
+    disp = Dispensary(env, parametersByUser, keepRows, steadyState)
+    disp.networkPickups = pickups
+    disp.trace = trace
+    store = MonitoredStore(env, 1000000, disp.openHoursClock)
+    if instrument:
+        instrumentation = Instrumentation(env, disp, store)
+    
+    def runEngine():
+        if engine == 'simpy' and observer is not None:
+            from .live import observerProcess, StopSimulation
+            startProcesses(env, store, disp)
+            env.process(observerProcess(env, store, disp, observer,
+                                        observeInterval))
+            try:
+                env.run(until = horizon)
+            except StopSimulation:
+                disp.resultsDict['stoppedAt'] = env.now
+        elif engine == 'simpy':
+            startProcesses(env, store, disp)
+            env.run(until = horizon)
+        elif engine == 'lindley':
+            lindleyEngine(disp, horizon)
+        else:
+            raise ValueError(f"Unknown engine '{engine}' "
+                             "(use 'simpy' or 'lindley')")
+    
+    if profilePath is None:
+        runEngine()
+    else:
+        hotspots = profiledCall(profilePath, runEngine)[1]
+    if instrument:
+        disp.resultsDict['instrumentation'] = instrumentation.report()
+    if profilePath is not None:
+        disp.resultsDict['profile'] = {'path': str(profilePath),
+                                       'hotspots': hotspots}
+    results = runResults(env, store, disp, engine, keepRows, steadyState,
+                         outputPath, parquetRoot, scenario, replication)
+    if breakdowns:
+        if not keepRows:
+            raise ValueError('breakdowns need the rows (keepRows = True)')
+        from .analytics import runBreakdowns, breakdownTables
+        statistics = runBreakdowns(disp.recorder)
+        if breakdowns == 'statistics':
+            results['breakdowns'] = statistics
+        else:
+            results['breakdowns'] = {name: table.to_dict(orient = 'records')
+                                     for name, table
+                                     in breakdownTables(statistics).items()}
+    return results
+
+#Starting the SimPy processes of a run (the dispatcher of pick-ups is kept,
+#so that it can be interrupted when the pick-up times change, see fork.py):
+def startProcesses(env, store, disp):
+    if disp.trace is not None:
+        env.process(traceGenerator(env, store, disp, traceChunks(disp.trace)))
+    else:
+        env.process(prescriptionGenerator(env, store, disp))
+    if disp.networkPickups is not None:
+        disp.dispatcher = env.process(networkDispatcher(env, store, disp,
+                                                        disp.networkPickups))
+    else:
+        disp.dispatcher = env.process(pickupDispatcher(env, store, disp))
+
+#Collecting the results at the end of a run (see simulationRunner):
+def runResults(env, store, disp, engine, keepRows, steadyState, outputPath,
+               parquetRoot, scenario, replication):
+    #Results from the streaming statistics (the main results are replaced
+    #by the ones calculated from the monitoring data-frame below, if rows
+    #have been kept):
+    disp.resultsDict.update(disp.stats.summary())
+    if steadyState:
+        disp.resultsDict.update(steadyStateResults(disp.stats.seriesBatches))
+    #The data-frames of the pick-ups and stages (and thus pandas) are only
+    #needed for Parquet output:
+    frames = parquetRoot is not None
+    if frames:
+        disp.pickupData = disp.pickupRecorder.toDataFrame()
+    #Utilization and queue lengths of each stage (from the SimPy resources,
+    #i.e. not for the Lindley engine):
+    if engine == 'simpy':
+        disp.resultsDict['stages'], disp.shiftData, disp.levelSeries = \
+          stageMonitoring(disp, store, env.now, frames)
+    if not keepRows:
+        if parquetRoot is not None:
+            writeParquet(disp, parquetRoot, scenario, replication)
+        return disp.resultsDict
+    
+    #Building the data-frame from the recorded arrays (once per run):
+    disp.monitoringDf = disp.recorder.toDataFrame()
+    
+    ##Analysing monitoring data-frame by adding calculated fields:
+    disp.monitoringDf['waitingForVerif'] = disp.monitoringDf['verifStarted'] \
+                                      - disp.monitoringDf['arrivalTime']
+    disp.monitoringDf['waitingForLabel'] = disp.monitoringDf['labelStarted'] \
+                                      - disp.monitoringDf['verifFinished']
+    disp.monitoringDf['waitingForDisp'] = disp.monitoringDf['dispStarted'] \
+                                      - disp.monitoringDf['labelFinished']
+    disp.monitoringDf['waitingForFinCheck'] = disp.monitoringDf['finCheckStarted'] \
+                                      - disp.monitoringDf['dispFinished']
+    disp.monitoringDf['waitingForTransp'] = disp.monitoringDf['timeOfPickup'] \
+                                      - disp.monitoringDf['putInStore']                                  
+    disp.monitoringDf['overallWaiting'] = disp.monitoringDf['waitingForVerif']\
+                                        + disp.monitoringDf['waitingForLabel']\
+                                        + disp.monitoringDf['waitingForDisp']\
+                                        + disp.monitoringDf['waitingForFinCheck']\
+                                        + disp.monitoringDf['waitingForTransp']
+    disp.monitoringDf['processInDisp'] = disp.monitoringDf['putInStore'] \
+                                      - disp.monitoringDf['arrivalTime']
+    disp.monitoringDf['throughputTime'] = disp.monitoringDf['timeOfDelivery'] \
+                                      - disp.monitoringDf['arrivalTime']
+    #Calculating and outputting results (it appears the 'mean' function 
+    #automatically ignores None values):
+    meanThroughput = round(disp.monitoringDf['throughputTime'].mean(), 2)
+    meanWaiting = round(disp.monitoringDf['overallWaiting'].mean(), 2)
+    totalWorkItems = len(disp.monitoringDf)
+    notCompletedWorkItems = disp.monitoringDf['timeOfDelivery'].isnull().sum()
+    completedWorkItems = totalWorkItems - notCompletedWorkItems
+    #(no prescriptions arrive e.g. when the run ends before the first
+    #opening; as in StreamingStatistics.summary)
+    if totalWorkItems > 0:
+        percentageCompleted = round((completedWorkItems / totalWorkItems)
+                                    * 100, 2)
+    else:
+        percentageCompleted = math.nan
+    
+    disp.resultsDict.update({'meanThroughput': meanThroughput,
+                                      'meanWaiting': meanWaiting,
+                                      'totalWorkItems': totalWorkItems,
+                                      'completedWorkItems': completedWorkItems,
+                                      'percentageCompleted': percentageCompleted})
+    results = disp.resultsDict
+    #Saving raw data to .csv file:
+    if outputPath is not None:
+        disp.monitoringDf.to_csv(outputPath, index = True)
+    if parquetRoot is not None:
+        writeParquet(disp, parquetRoot, scenario, replication)
+    return results
@@ -0,0 +1,35 @@
+import itertools
+import hashlib
+import json
+import numpy
+
+############################################################################
+###  Scenarios                                                           ###
+############################################################################
+
+#Building the Cartesian grid of scenarios: every combination of the values
+#given per parameter, e.g. scenarioGrid(defaultParameters, 
+#numPharmacists = [2, 4, 6], weekdayPickup = [[10, 12, 15, 17], [10, 15]])
+#returns six parameter dictionaries.
+def scenarioGrid(baseParams, **valuesPerParameter):
+    names = list(valuesPerParameter)
+    scenarios = []
+    for combination in itertools.product(*valuesPerParameter.values()):
+        scenarios.append(dict(baseParams, **dict(zip(names, combination))))
+    return scenarios
+
+#A stable identifier of a scenario: a hash of its parameters (apart from 
+#the seed, which differs between the replications of a scenario, and the
+#antithetic flag, which marks antithetic replications). NumPy values give
+#the same key as the equal Python values (e.g. numpy.int64(3) and 3).
+def scenarioKey(params):
+    scenario = {k: v for k, v in params.items()
+                if k not in ['seed', 'antithetic']}
+    canonical = json.dumps(scenario, sort_keys = True, default = jsonDefault)
+    return hashlib.sha256(canonical.encode()).hexdigest()[:16]
+
+#Converting NumPy numbers (and anything else JSON does not know) for storage:
+def jsonDefault(value):
+    if isinstance(value, (numpy.generic, numpy.ndarray)):
+        return value.tolist()
+    return str(value)
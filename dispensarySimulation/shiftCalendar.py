@@ -0,0 +1,127 @@
+import bisect
+import numpy
+
+############################################################################
+### Calendar of opening hours                                            ###
+############################################################################
+#The opening hours repeat every week. For each shift (one per day) of the
+#week the calendar below stores when it starts and ends (in hours since
+#Monday 0:00) and how many open hours have passed in the week before it
+#starts. Any time-point can thus be converted into the number of open hours
+#since the start of the simulation (and back) with some arithmetic and a
+#binary search, without walking from one day to the next.
+class ShiftCalendar(object):
+  def __init__(self, openingHours, namesOfWeekdays):
+    self.namesOfWeekdays = namesOfWeekdays
+    self.hoursPerWeek = 24 * len(namesOfWeekdays)
+    self.shiftStarts = []
+    self.shiftEnds = []
+    self.openHoursBeforeShift = []
+    openHoursSoFar = 0
+    for day, name in enumerate(namesOfWeekdays):
+        self.shiftStarts.append(24 * day + min(openingHours[name]))
+        self.shiftEnds.append(24 * day + max(openingHours[name]))
+        self.openHoursBeforeShift.append(openHoursSoFar)
+        openHoursSoFar += max(openingHours[name]) - min(openingHours[name])
+    self.openHoursPerWeek = openHoursSoFar
+    #the same as arrays, for the vectorised versions of the methods below:
+    self.shiftStartsArray = numpy.array(self.shiftStarts, dtype = float)
+    self.shiftEndsArray = numpy.array(self.shiftEnds, dtype = float)
+    self.openHoursBeforeShiftArray = numpy.array(self.openHoursBeforeShift,
+                                                 dtype = float)
+  
+  def timeOfDay(self, simulationTime):
+      return simulationTime % 24
+  
+  #The simulation starts on a Monday at 0:00:
+  def nameOfWeekday(self, simulationTime):
+      return self.namesOfWeekdays[int(simulationTime % self.hoursPerWeek) // 24]
+  
+  #Number of open hours between the start of the simulation and the given
+  #time-point (time-points outside opening hours count as the end of the
+  #preceding shift):
+  def openHoursUntil(self, simulationTime):
+      weeks, timeInWeek = divmod(simulationTime, self.hoursPerWeek)
+      shift = bisect.bisect_right(self.shiftStarts, timeInWeek) - 1
+      if shift < 0:
+          return weeks * self.openHoursPerWeek
+      return weeks * self.openHoursPerWeek + \
+             self.openHoursBeforeShift[shift] + \
+             min(timeInWeek, self.shiftEnds[shift]) - self.shiftStarts[shift]
+  
+  #The inverse of openHoursUntil: the time-point at which the given number of
+  #open hours has passed (an amount of open hours ending exactly at a closing
+  #time is mapped onto that closing time, not onto the next opening):
+  def timeAfterOpenHours(self, openHours):
+      weeks, openHoursInWeek = divmod(openHours, self.openHoursPerWeek)
+      if openHoursInWeek == 0 and weeks > 0:
+          weeks -= 1
+          openHoursInWeek = self.openHoursPerWeek
+      shift = max(bisect.bisect_left(self.openHoursBeforeShift,
+                                     openHoursInWeek) - 1, 0)
+      return weeks * self.hoursPerWeek + self.shiftStarts[shift] + \
+             openHoursInWeek - self.openHoursBeforeShift[shift]
+  
+  #Number of the shift (0, 1, ... since the start of the simulation; one per
+  #day) in which the given number of open hours is reached, together with
+  #the number of open hours at the end of that shift:
+  def shiftOfOpenHours(self, openHours):
+      weeks, openHoursInWeek = divmod(openHours, self.openHoursPerWeek)
+      shift = bisect.bisect_right(self.openHoursBeforeShift,
+                                  openHoursInWeek) - 1
+      shiftEnd = weeks * self.openHoursPerWeek + \
+                 self.openHoursBeforeShift[shift] + \
+                 self.shiftEnds[shift] - self.shiftStarts[shift]
+      return int(weeks) * len(self.namesOfWeekdays) + shift, shiftEnd
+  
+  #Time-point when an activity, started at startTime and requiring the given
+  #number of open hours, is finished:
+  def finishTime(self, startTime, duration):
+      return max(self.timeAfterOpenHours(self.openHoursUntil(startTime) + \
+                                         duration),
+                 startTime)
+  
+  #Time-point when an activity, taken up at the given time-point, actually
+  #starts: the next opening if that is outside opening hours (or exactly at
+  #a closing time), as timeAfterOpenHoursArray with atOpening = True:
+  def startTime(self, simulationTime):
+      weeks, openHoursInWeek = divmod(self.openHoursUntil(simulationTime),
+                                      self.openHoursPerWeek)
+      shift = bisect.bisect_right(self.openHoursBeforeShift,
+                                  openHoursInWeek) - 1
+      return max(weeks * self.hoursPerWeek + self.shiftStarts[shift] + \
+                 openHoursInWeek - self.openHoursBeforeShift[shift],
+                 simulationTime)
+  
+  #Vectorised versions of the methods above, taking and returning arrays:
+  def weekdayCodes(self, simulationTimes):
+      return ((simulationTimes % self.hoursPerWeek) // 24).astype(numpy.int8)
+  
+  def openHoursUntilArray(self, simulationTimes):
+      weeks, timeInWeek = numpy.divmod(simulationTimes, self.hoursPerWeek)
+      shift = numpy.searchsorted(self.shiftStartsArray, timeInWeek,
+                                 side = 'right') - 1
+      beforeFirstShift = shift < 0
+      shift = numpy.maximum(shift, 0)
+      openHoursInWeek = self.openHoursBeforeShiftArray[shift] + \
+                        numpy.minimum(timeInWeek, self.shiftEndsArray[shift]) \
+                        - self.shiftStartsArray[shift]
+      return weeks * self.openHoursPerWeek + \
+             numpy.where(beforeFirstShift, 0, openHoursInWeek)
+  
+  #(with atOpening = True, an amount of open hours ending exactly at a 
+  #closing time is mapped onto the next opening instead, as is needed for
+  #times when activities start):
+  def timeAfterOpenHoursArray(self, openHours, atOpening = False):
+      weeks, openHoursInWeek = numpy.divmod(openHours, self.openHoursPerWeek)
+      if not atOpening:
+          endOfWeek = (openHoursInWeek == 0) & (weeks > 0)
+          weeks = weeks - endOfWeek
+          openHoursInWeek = numpy.where(endOfWeek, self.openHoursPerWeek,
+                                        openHoursInWeek)
+      side = 'right' if atOpening else 'left'
+      shift = numpy.maximum(numpy.searchsorted(self.openHoursBeforeShiftArray,
+                                               openHoursInWeek,
+                                               side = side) - 1, 0)
+      return weeks * self.hoursPerWeek + self.shiftStartsArray[shift] + \
+             openHoursInWeek - self.openHoursBeforeShiftArray[shift]
@@ -0,0 +1,137 @@
+import concurrent.futures
+import itertools
+import os
+import numpy
+import simpy
+
+from .dispensary import Dispensary
+from .replications import runBatch, summarise, summaryResults
+
+############################################################################
+###  Staffing optimisation                                               ###
+############################################################################
+#Finding the cheapest staffing (number of pharmacists, labellers, dispensers
+#and final checkers) for which the mean throughput time stays below a limit
+#(and, optionally, a minimum percentage of prescriptions is completed), e.g.
+#  optimiseStaffing(defaultParameters, costs = {'numPharmacists': 60,
+#                   'numLabellers': 25, 'numDispensers': 25,
+#                   'numFinCheckers': 45}, maxThroughput = 8)
+#Instead of simulating a whole grid of staffings, candidates are visited in
+#order of their cost, so that the first one found to meet the constraints
+#is the cheapest one. Each candidate gets replications in batches only
+#until its confidence intervals are clearly on one side of the limits (or
+#maxReplications have been run, when its means decide), so clear cases
+#cost few replications (the batches start at initialReplications and then
+#double, within the replications left to the candidate, whatever the
+#number of workers). This is a sequential screening of the candidates one
+#at a time against fixed limits, not a ranking-and-selection procedure
+#(e.g. KN or Rinott's): the candidates are never compared with each other,
+#the confidence level holds per decision rather than for the choice as a
+#whole, and a candidate decided by its means may be wrongly ruled in or
+#out. It is assumed that more staff never makes things worse: a staffing
+#that fails the constraints rules out every staffing with no more staff in
+#any role, without simulating it. Staffings in which a role has less
+#capacity than prescriptions arrive are ruled out too (the queue in front
+#of it would grow without limit; with an arrivalProfile, its mean rate over
+#the opening hours counts). All candidates use the
+#same seeds (common random numbers), which makes them easier to compare.
+
+staffRoles = ['numPharmacists', 'numLabellers', 'numDispensers',
+              'numFinCheckers']
+
+#True if the constraints are clearly met, False if they are clearly not
+#met, None if the confidence intervals do not tell yet:
+def feasibility(summary, maxThroughput, minCompleted):
+    throughput = summary['meanThroughput']
+    completed = summary['percentageCompleted']
+    if throughput['lower'] > maxThroughput:
+        return False
+    if minCompleted is not None and completed['upper'] < minCompleted:
+        return False
+    if throughput['upper'] <= maxThroughput and \
+       (minCompleted is None or completed['lower'] >= minCompleted):
+        return True
+    return None
+
+def feasibleByMeans(summary, maxThroughput, minCompleted):
+    return summary['meanThroughput']['mean'] <= maxThroughput and \
+           (minCompleted is None or
+            summary['percentageCompleted']['mean'] >= minCompleted)
+
+#Whether staffing a has no more staff than staffing b in any role:
+def dominatedBy(a, b):
+    return all(x <= y for x, y in zip(a, b))
+
+#bounds are the smallest and largest number of staff per role, either one
+#pair for all roles or a dictionary with a pair per role:
+def optimiseStaffing(params, costs, maxThroughput, minCompleted = None,
+                     bounds = (1, 10), confidence = 0.95,
+                     initialReplications = 4, maxReplications = 40,
+                     workers = None, **runOptions):
+    workers = workers or os.cpu_count() or 1
+    if not isinstance(bounds, dict):
+        bounds = {role: bounds for role in staffRoles}
+    candidates = sorted(itertools.product(*[range(bounds[role][0],
+                                                  bounds[role][1] + 1)
+                                            for role in staffRoles]),
+                        key = lambda staffing: (sum(
+                          costs[role] * n for role, n
+                          in zip(staffRoles, staffing)), staffing))
+    seeds = numpy.random.SeedSequence(params.get('seed')).spawn(
+              maxReplications)
+    #minimum number of staff per role for a stable queue:
+    disp = Dispensary(simpy.Environment(), dict(params), keepRows = False)
+    if disp.arrivalProfile is not None:
+        arrivalRate = disp.arrivalProfile.meanRateWhenOpen(disp.calendar)
+    else:
+        arrivalRate = 1 / disp.interarrivTime
+    minimumStaff = disp.averageStepDur * arrivalRate
+    infeasible = []
+    evaluated = []
+    best = None
+    pruned = 0
+    if workers == 1:
+        executor = None
+    else:
+        executor = concurrent.futures.ProcessPoolExecutor(workers)
+    try:
+        for staffing in candidates:
+            if min(staffing) <= minimumStaff or \
+               any(dominatedBy(staffing, worse) for worse in infeasible):
+                pruned += 1
+                continue
+            candidate = dict(params, **dict(zip(staffRoles, staffing)))
+            replications = []
+            batchSize = initialReplications
+            decision = None
+            while decision is None and len(replications) < maxReplications:
+                batchSize = min(batchSize, maxReplications - len(replications))
+                replications += runBatch(
+                  executor, candidate,
+                  seeds[len(replications):len(replications) + batchSize],
+                  runOptions, len(replications))
+                summary = summarise(replications, summaryResults, confidence)
+                decision = feasibility(summary, maxThroughput, minCompleted)
+                batchSize = len(replications)
+            decidedByMeans = decision is None
+            if decidedByMeans:
+                decision = feasibleByMeans(summary, maxThroughput,
+                                           minCompleted)
+            evaluated.append({'staffing': dict(zip(staffRoles, staffing)),
+                              'cost': sum(costs[role] * n for role, n
+                                          in zip(staffRoles, staffing)),
+                              'replications': len(replications),
+                              'feasible': decision,
+                              'decidedByMeans': decidedByMeans,
+                              'summary': summary})
+            if decision:
+                best = evaluated[-1]
+                break
+            infeasible.append(staffing)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    return {'best': best,
+            'evaluated': evaluated,
+            'pruned': pruned,
+            'replications': sum(e['replications'] for e in evaluated)}
@@ -0,0 +1,195 @@
+import math
+import numpy
+
+from .confidence import confidenceInterval
+
+############################################################################
+### Streaming statistics                                                 ###
+############################################################################
+#Keeping one row per prescription makes memory grow with the simulated time.
+#The classes below summarise values as they are produced, in constant 
+#memory, so that rows only need to be kept if they are wanted.
+
+#Count, mean, variance, minimum and maximum of a stream of values, added as
+#whole arrays at a time (by merging their summary with the running one, as
+#proposed by Chan et al.).
+class RunningMoments(object):
+  def __init__(self):
+    self.n = 0
+    self.mean = 0.0
+    self.sumOfSquares = 0.0 #of the differences to the mean
+    self.min = math.inf
+    self.max = -math.inf
+  
+  def addMany(self, values):
+      n = len(values)
+      if n == 0:
+          return
+      mean = float(numpy.mean(values))
+      sumOfSquares = float(numpy.sum((values - mean)**2))
+      total = self.n + n
+      delta = mean - self.mean
+      self.mean += delta * n / total
+      self.sumOfSquares += sumOfSquares + delta**2 * self.n * n / total
+      self.n = total
+      self.min = min(self.min, float(numpy.min(values)))
+      self.max = max(self.max, float(numpy.max(values)))
+  
+  def variance(self):
+      return self.sumOfSquares / (self.n - 1) if self.n > 1 else math.nan
+  
+  def meanOrNan(self):
+      return self.mean if self.n > 0 else math.nan
+
+#Approximate quantiles of a stream of (non-negative) values in constant
+#memory: values are counted in buckets whose bounds grow geometrically, so
+#that every quantile is estimated with a relative error of at most 
+#relativeAccuracy (the 'DDSketch' of Masson et al.). Unlike P-square, the
+#buckets can be filled from whole arrays at once and merged across runs.
+#Values below minValue (e.g. waiting times of zero) are counted separately.
+class QuantileSketch(object):
+  def __init__(self, relativeAccuracy = 0.01, minValue = 1e-6):
+    self.gamma = (1 + relativeAccuracy) / (1 - relativeAccuracy)
+    self.logGamma = math.log(self.gamma)
+    self.minValue = minValue
+    self.counts = {}
+    self.zeroCount = 0
+    self.n = 0
+  
+  def addMany(self, values):
+      values = numpy.asarray(values, dtype = float)
+      self.n += len(values)
+      small = values < self.minValue
+      self.zeroCount += int(numpy.sum(small))
+      buckets = numpy.ceil(numpy.log(values[~small]) / self.logGamma)
+      buckets, counts = numpy.unique(buckets.astype(numpy.int64),
+                                     return_counts = True)
+      for bucket, count in zip(buckets.tolist(), counts.tolist()):
+          self.counts[bucket] = self.counts.get(bucket, 0) + count
+  
+  def merge(self, other):
+      self.n += other.n
+      self.zeroCount += other.zeroCount
+      for bucket, count in other.counts.items():
+          self.counts[bucket] = self.counts.get(bucket, 0) + count
+  
+  def quantile(self, q):
+      if self.n == 0:
+          return math.nan
+      rank = q * (self.n - 1)
+      if rank < self.zeroCount:
+          return 0.0
+      seen = self.zeroCount
+      for bucket in sorted(self.counts):
+          seen += self.counts[bucket]
+          if seen > rank:
+              #the middle of the bucket (in terms of relative error):
+              return 2 * self.gamma**bucket / (self.gamma + 1)
+      return math.nan
+
+#All summaries of a simulation run: numbers of prescriptions, moments of 
+#each waiting time (per step and overall) and of throughput times, and
+#quantiles of overall waiting and throughput times. Waiting times are added
+#when prescriptions are picked up, throughput times when they are delivered
+#(for all prescriptions of a pick-up at once).
+class StreamingStatistics(object):
+  waitingTimes = ['waitingForVerif', 'waitingForLabel', 'waitingForDisp',
+                  'waitingForFinCheck', 'waitingForTransp', 'overallWaiting']
+  quantiles = [0.5, 0.9, 0.95]
+  
+  #With collectSeries, the throughput times are also kept in order of 
+  #delivery as means of batches of five (for detecting the warm-up period):
+  def __init__(self, collectSeries = False):
+    self.arrivals = 0
+    self.pickedUp = 0
+    self.delivered = 0
+    self.seriesBatches = [] if collectSeries else None
+    self.seriesPending = []
+    self.moments = {name: RunningMoments()
+                    for name in self.waitingTimes + ['throughputTime']}
+    self.sketches = {'overallWaiting': QuantileSketch(),
+                     'throughputTime': QuantileSketch()}
+  
+  def addArrival(self):
+      self.arrivals += 1
+  
+  #waits maps the names in waitingTimes, apart from 'overallWaiting', to
+  #arrays (one value per prescription):
+  def addPickups(self, waits):
+      overallWaiting = sum(waits[name] for name in self.waitingTimes[:-1])
+      self.pickedUp += len(overallWaiting)
+      for name in self.waitingTimes[:-1]:
+          self.moments[name].addMany(waits[name])
+      self.moments['overallWaiting'].addMany(overallWaiting)
+      self.sketches['overallWaiting'].addMany(overallWaiting)
+  
+  def addDeliveries(self, throughputTimes):
+      self.delivered += len(throughputTimes)
+      self.moments['throughputTime'].addMany(throughputTimes)
+      self.sketches['throughputTime'].addMany(throughputTimes)
+      if self.seriesBatches is not None:
+          values = numpy.concatenate((self.seriesPending, throughputTimes))
+          complete = len(values) // 5 * 5
+          self.seriesBatches.extend(
+            values[:complete].reshape(-1, 5).mean(axis = 1).tolist())
+          self.seriesPending = values[complete:].tolist()
+  
+  #Results in the same form (and rounding) as in simulationRunner:
+  def summary(self):
+      moments = self.moments
+      completed = self.delivered
+      if self.arrivals > 0:
+          percentage = completed / self.arrivals * 100
+      else:
+          percentage = math.nan
+      results = {'meanThroughput':
+                   round(moments['throughputTime'].meanOrNan(), 2),
+                 'meanWaiting': 
+                   round(moments['overallWaiting'].meanOrNan(), 2),
+                 'totalWorkItems': self.arrivals,
+                 'completedWorkItems': completed,
+                 'percentageCompleted': round(percentage, 2),
+                 'stdThroughput': round(math.sqrt(
+                                    moments['throughputTime'].variance()), 2)}
+      for q in self.quantiles:
+          results[f'throughputP{round(q * 100)}'] = \
+            round(self.sketches['throughputTime'].quantile(q), 2)
+      for name in self.waitingTimes[:-1]:
+          results['mean' + name[0].upper() + name[1:]] = \
+            round(moments[name].meanOrNan(), 2)
+      return results
+
+#Warm-up period of a series of batch means (of five values each), as given
+#by the MSER-5 rule (White, 1997): the number of batches d at the start of
+#the series whose deletion minimises the squared standard error of the mean
+#of the remaining batches, searched in the first half of the series only.
+def mser5(batchMeans):
+    batchMeans = numpy.asarray(batchMeans, dtype = float)
+    k = len(batchMeans)
+    if k < 2:
+        return 0
+    #sums of the remaining batches after deleting d = 0, 1, ..., k - 1:
+    remaining = numpy.arange(k, 0, -1)
+    sums = numpy.cumsum(batchMeans[::-1])[::-1]
+    sumsOfSquares = numpy.cumsum(batchMeans[::-1]**2)[::-1]
+    squaredErrors = (sumsOfSquares - sums**2 / remaining) / remaining**2
+    return int(numpy.argmin(squaredErrors[:k // 2 + 1]))
+
+#Steady-state results of one long run: the warm-up period (in batches of 
+#five throughput times) is detected with MSER-5 and deleted; the rest is
+#split into numBatches batches whose means give a confidence interval for
+#the mean throughput time (the method of batch means).
+def steadyStateResults(batchMeans, numBatches = 20, confidence = 0.95):
+    deleted = mser5(batchMeans)
+    kept = numpy.asarray(batchMeans[deleted:], dtype = float)
+    numBatches = min(numBatches, len(kept))
+    if numBatches > 0:
+        perBatch = len(kept) // numBatches
+        batches = kept[:perBatch * numBatches].reshape(numBatches, perBatch)
+        interval = confidenceInterval(batches.mean(axis = 1), confidence)
+    else:
+        interval = confidenceInterval([], confidence)
+    return {'warmupPrescriptions': 5 * deleted,
+            'steadyStateThroughput': round(interval['mean'], 2),
+            'steadyStateHalfWidth': round(interval['halfWidth'], 2),
+            'numBatches': numBatches}
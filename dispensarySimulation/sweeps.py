@@ -0,0 +1,160 @@
+import concurrent.futures
+import json
+import sqlite3
+import numpy
+
+from .scenarios import scenarioKey, jsonDefault
+from .confidence import confidenceInterval
+from .replications import replicationRunner
+
+############################################################################
+###  Scenario sweeps                                                     ###
+############################################################################
+
+#Results of a sweep are stored in an SQLite database, one row per finished
+#(scenario, replication) task, so that an interrupted sweep can be resumed
+#and results can be queried while the sweep is still running.
+class SweepStore(object):
+  def __init__(self, path):
+    self.path = path
+    self.connection = sqlite3.connect(path)
+    self.connection.execute('PRAGMA journal_mode = WAL')
+    self.connection.executescript('''
+      CREATE TABLE IF NOT EXISTS settings (
+        name TEXT PRIMARY KEY,
+        value TEXT);
+      CREATE TABLE IF NOT EXISTS scenarios (
+        scenarioKey TEXT PRIMARY KEY,
+        parameters TEXT);
+      CREATE TABLE IF NOT EXISTS results (
+        scenarioKey TEXT,
+        replication INTEGER,
+        meanThroughput REAL,
+        meanWaiting REAL,
+        percentageCompleted REAL,
+        results TEXT,
+        PRIMARY KEY (scenarioKey, replication));
+    ''')
+    self.connection.commit()
+  
+  def close(self):
+      self.connection.close()
+  
+  #The options of simulationRunner used for a sweep are stored with the
+  #results; resuming the sweep with other options would mix results that
+  #cannot be compared (paths are stored as strings):
+  def checkRunOptions(self, runOptions):
+      options = json.dumps(runOptions, sort_keys = True,
+                           default = jsonDefault)
+      row = self.connection.execute(
+              "SELECT value FROM settings WHERE name = 'runOptions'").fetchone()
+      if row is None:
+          self.connection.execute(
+            "INSERT INTO settings VALUES ('runOptions', ?)", (options,))
+          self.connection.commit()
+      elif row[0] != options:
+          raise ValueError(f'{self.path} holds results for the run options '
+                           f'{row[0]}, not {options}')
+  
+  #The root seed of the sweep is stored with the results, so that resuming
+  #a sweep (with the same seed or none) uses the same seeds for the
+  #remaining tasks; resuming it with another seed would mix results of
+  #other random numbers in:
+  def rootEntropy(self, seed):
+      row = self.connection.execute(
+              "SELECT value FROM settings WHERE name = 'entropy'").fetchone()
+      if row is not None:
+          if seed is not None and \
+             numpy.random.SeedSequence(seed).entropy != int(row[0]):
+              raise ValueError(f'{self.path} holds results for the seed '
+                               f'{row[0]}, not {seed}')
+          return int(row[0])
+      entropy = numpy.random.SeedSequence(seed).entropy
+      self.connection.execute(
+        "INSERT INTO settings VALUES ('entropy', ?)", (str(entropy),))
+      self.connection.commit()
+      return entropy
+  
+  def addScenario(self, params):
+      key = scenarioKey(params)
+      scenario = {k: v for k, v in params.items() if k != 'seed'}
+      self.connection.execute(
+        'INSERT OR IGNORE INTO scenarios VALUES (?, ?)',
+        (key, json.dumps(scenario, sort_keys = True,
+                         default = jsonDefault)))
+      self.connection.commit()
+      return key
+  
+  def addResult(self, key, replication, results):
+      self.connection.execute(
+        'INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?)',
+        (key, replication,
+         float(results['meanThroughput']),
+         float(results['meanWaiting']),
+         float(results['percentageCompleted']),
+         json.dumps(results, default = jsonDefault)))
+      self.connection.commit()
+  
+  def finishedTasks(self):
+      return set(self.connection.execute(
+                   'SELECT scenarioKey, replication FROM results'))
+  
+  def scenarios(self):
+      rows = self.connection.execute('SELECT scenarioKey, parameters '
+                                     'FROM scenarios ORDER BY rowid')
+      return {key: json.loads(parameters) for key, parameters in rows}
+  
+  #All stored results of one scenario (one dictionary per replication):
+  def results(self, key):
+      rows = self.connection.execute('SELECT results FROM results '
+                                     'WHERE scenarioKey = ? '
+                                     'ORDER BY replication', (key,))
+      return [json.loads(row[0]) for row in rows]
+  
+  #Mean and confidence interval of the given results per scenario:
+  def aggregate(self, resultNames = ('meanThroughput', 'meanWaiting',
+                                     'percentageCompleted'),
+                confidence = 0.95):
+      aggregated = []
+      for key, parameters in self.scenarios().items():
+          replications = self.results(key)
+          summary = {'scenarioKey': key,
+                     'parameters': parameters,
+                     'replications': len(replications)}
+          for name in resultNames:
+              summary[name] = confidenceInterval(
+                                [r[name] for r in replications], confidence)
+          aggregated.append(summary)
+      return aggregated
+
+#Running the given number of replications of every scenario, spread over
+#worker processes, and appending each finished replication to the store at
+#storePath. Tasks already in the store are skipped, so calling runSweep 
+#again after an interruption only runs the remaining tasks. Replication r
+#of every scenario gets the same seed (spawned from the root seed). Further
+#keyword arguments are passed on to simulationRunner.
+def runSweep(scenarios, replications, storePath, seed = None, workers = None,
+             **runOptions):
+    store = SweepStore(storePath)
+    try:
+        store.checkRunOptions(runOptions)
+        entropy = store.rootEntropy(seed)
+        finished = store.finishedTasks()
+        tasks = []
+        for params in scenarios:
+            key = store.addScenario(params)
+            for r in range(replications):
+                if (key, r) not in finished:
+                    seedSequence = numpy.random.SeedSequence(entropy,
+                                                             spawn_key = (r,))
+                    tasks.append((key, r, dict(params, seed = seedSequence)))
+        with concurrent.futures.ProcessPoolExecutor(workers) as executor:
+            futures = {executor.submit(replicationRunner, params,
+                                       dict(runOptions, replication = r)):
+                         (key, r) for key, r, params in tasks}
+            for future in concurrent.futures.as_completed(futures):
+                key, r = futures[future]
+                store.addResult(key, r, future.result())
+        return store.aggregate()
+    finally:
+        store.close()
@@ -0,0 +1,120 @@
+import numpy
+
+############################################################################
+###  Traces of arrivals                                                  ###
+############################################################################
+#Instead of drawing exponential interarrival times, the arrivals of a run
+#can be replayed from a trace, e.g. a log of real prescriptions:
+#  simulationRunner(params, trace = 'prescriptions2023.csv', horizon = 8760)
+#A trace is read in chunks, only as far as the simulation has got, so that
+#even traces with millions of prescriptions (e.g. a year) are replayed in
+#constant memory (by the SimPy engine; the Lindley engine works on arrays of
+#all prescriptions of a run anyway). A trace is either
+#- a .csv file with a column arrivalTime, in hours since the start of the
+#  run (Monday 0:00), or with dates and times (e.g. '2023-03-06 09:12'),
+#  which are counted from the Monday 0:00 of the week of the first one
+#  (or from start, if given), or
+#- a .npy file (see convertTrace), which is memory-mapped rather than read:
+#  a column (or one-dimensional array) of arrival times in hours.
+#Arrival times must be in ascending order. A trace may also give the
+#durations of the four steps of each prescription (in hours), in the
+#columns verifDuration, labelDuration, dispDuration and finCheckDuration
+#(the other four columns of a .npy file); otherwise, these are drawn as
+#usual. Arrivals are taken as they are, also outside opening hours (the
+#steps then start at the next opening, see durationAdjuster).
+
+durationColumns = ['verifDuration', 'labelDuration', 'dispDuration',
+                   'finCheckDuration']
+
+#Chunks of a trace, as pairs of arrays: arrival times and durations (one
+#row per prescription, one column per step), or None without durations:
+def traceChunks(path, chunkSize = 65536, start = None):
+    path = str(path)
+    if path.endswith('.npy'):
+        chunks = npyChunks(path, chunkSize)
+    else:
+        chunks = csvChunks(path, chunkSize, start)
+    lastTime = -numpy.inf
+    for arrivalTimes, durations in chunks:
+        if len(arrivalTimes) == 0:
+            continue
+        if arrivalTimes[0] < lastTime or \
+           numpy.any(numpy.diff(arrivalTimes) < 0):
+            raise ValueError(f'The arrival times in {path} are not in '
+                             'ascending order')
+        lastTime = arrivalTimes[-1]
+        yield arrivalTimes, durations
+
+def npyChunks(path, chunkSize):
+    trace = numpy.load(path, mmap_mode = 'r')
+    for i in range(0, len(trace), chunkSize):
+        #(copying only the chunk from the memory-mapped file)
+        chunk = numpy.array(trace[i:i + chunkSize], dtype = float)
+        if chunk.ndim == 1:
+            yield chunk, None
+        else:
+            yield chunk[:, 0], (chunk[:, 1:5] if chunk.shape[1] >= 5
+                                else None)
+
+def csvChunks(path, chunkSize, start):
+    import pandas
+    columns = pandas.read_csv(path, nrows = 0).columns
+    if 'arrivalTime' not in columns:
+        raise ValueError(f"{path} has no column 'arrivalTime'")
+    withDurations = all(name in columns for name in durationColumns)
+    usedColumns = ['arrivalTime'] + (durationColumns if withDurations else [])
+    for chunk in pandas.read_csv(path, usecols = usedColumns,
+                                 chunksize = chunkSize):
+        times = chunk['arrivalTime']
+        if not pandas.api.types.is_numeric_dtype(times):
+            times = pandas.to_datetime(times)
+            if start is None:
+                first = times.iloc[0]
+                start = first.normalize() - pandas.Timedelta(
+                                              days = first.dayofweek)
+            times = (times - pandas.Timestamp(start)) / \
+                    pandas.Timedelta(hours = 1)
+        yield (times.to_numpy(dtype = float),
+               chunk[durationColumns].to_numpy(dtype = float)
+               if withDurations else None)
+
+#All arrivals of a trace before the given time (for the Lindley engine):
+#arrival times and durations (or None), as for traceChunks.
+def traceUntil(path, until, chunkSize = 65536):
+    times = []
+    durations = []
+    for arrivalTimes, chunkDurations in traceChunks(path, chunkSize):
+        before = arrivalTimes < until
+        times.append(arrivalTimes[before])
+        if chunkDurations is not None:
+            durations.append(chunkDurations[before])
+        if not before.all():
+            break
+    arrivalTimes = numpy.concatenate(times) if times else numpy.zeros(0)
+    if durations and len(durations) == len(times):
+        return arrivalTimes, numpy.concatenate(durations)
+    return arrivalTimes, None
+
+#Converting a .csv trace into a .npy file (which is memory-mapped when
+#replayed, i.e. faster to read), in constant memory: the rows are counted
+#first, then the file is written chunk by chunk.
+def convertTrace(csvPath, npyPath, chunkSize = 65536, start = None):
+    import numpy.lib.format
+    rows = 0
+    withDurations = False
+    for arrivalTimes, durations in traceChunks(csvPath, chunkSize, start):
+        rows += len(arrivalTimes)
+        withDurations = durations is not None
+    trace = numpy.lib.format.open_memmap(
+              npyPath, mode = 'w+', dtype = float,
+              shape = (rows, 5) if withDurations else (rows,))
+    row = 0
+    for arrivalTimes, durations in traceChunks(csvPath, chunkSize, start):
+        if withDurations:
+            trace[row:row + len(arrivalTimes), 0] = arrivalTimes
+            trace[row:row + len(arrivalTimes), 1:] = durations
+        else:
+            trace[row:row + len(arrivalTimes)] = arrivalTimes
+        row += len(arrivalTimes)
+    trace.flush()
+    del trace
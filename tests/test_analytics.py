@@ -0,0 +1,86 @@
+import json
+import numpy
+import pandas
+import pickle
+import pytest
+
+from dispensarySimulation.analytics import (GroupedStatistics, measures,
+                                            replicationBreakdowns)
+from dispensarySimulation.parameters import defaultParameters
+from dispensarySimulation.runner import simulationRunner
+
+############################################################################
+###  Breakdowns by time of arrival and pick-up                           ###
+############################################################################
+
+#A run with breakdowns, and its monitoring data (as written to .csv):
+@pytest.fixture(scope = 'module')
+def breakdownRun(tmp_path_factory):
+    path = tmp_path_factory.mktemp('breakdowns') / 'monitoringDf.csv'
+    results = simulationRunner(dict(defaultParameters, seed = 2),
+                               outputPath = path, horizon = 336,
+                               breakdowns = True)
+    return results['breakdowns'], pandas.read_csv(path)
+
+def testArrivalBreakdownAgainstGroupby(breakdownRun):
+    breakdowns, df = breakdownRun
+    table = pandas.DataFrame(breakdowns['arrival'])
+    grouped = df.groupby(numpy.floor(df['arrivalTime'] % 168))
+    assert list(table['dayOfWeekOfArrival'] + ' ' +
+                table['hourOfArrival'].astype(str)) == \
+           [f"{df['dayOfWeekOfArrival'].iloc[rows[0]]} {int(hour % 24)}"
+            for hour, rows in grouped.indices.items()]
+    assert list(table['prescriptions']) == list(grouped.size())
+    for m in measures:
+        assert list(table[m + 'Count']) == list(grouped[m].count()), m
+        assert numpy.allclose(table[m + 'Mean'], grouped[m].mean(),
+                              equal_nan = True), m
+        assert numpy.allclose(table[m + 'Std'], grouped[m].std(),
+                              equal_nan = True), m
+
+def testPickupQuantilesWithinRelativeAccuracy(breakdownRun):
+    breakdowns, df = breakdownRun
+    table = pandas.DataFrame(breakdowns['pickup'])
+    pickedUp = df[df['timeOfPickup'].notna()]
+    grouped = pickedUp.groupby(numpy.round(pickedUp['timeOfPickup'] % 168
+                                           * 60))
+    assert list(table['prescriptions']) == list(grouped.size())
+    #(the sketch gives a value within 1% of one of the neighbouring ranks)
+    for q in [0.5, 0.9]:
+        exact = {side: grouped['waitingForTransp'].quantile(
+                         q, interpolation = side)
+                 for side in ['lower', 'higher']}
+        approximate = table[f'waitingForTranspP{round(q * 100)}']
+        assert (approximate >= exact['lower'].values * 0.99 - 1e-6).all()
+        assert (approximate <= exact['higher'].values * 1.01 + 1e-6).all()
+
+def testBreakdownsOfARunAreJsonData(breakdownRun):
+    breakdowns = breakdownRun[0]
+    assert json.loads(json.dumps(breakdowns)) is not None
+    assert set(breakdowns['arrival'][0]) >= {'dayOfWeekOfArrival',
+                                             'overallWaitingP95'}
+
+def testStatisticsArePickledSparsely():
+    statistics = GroupedStatistics()
+    rng = numpy.random.default_rng(1)
+    keys = rng.integers(0, 168, 5000)
+    statistics.add(keys, {m: rng.exponential(2, 5000) for m in measures})
+    dense = sum(h.nbytes for h in statistics.histograms.values())
+    data = pickle.dumps(statistics)
+    assert len(data) < dense / 10
+    copy = pickle.loads(data)
+    for m in measures:
+        assert (copy.histograms[m] == statistics.histograms[m]).all()
+        assert (copy.quantiles(m, 0.9) == statistics.quantiles(m, 0.9)).all()
+
+def testReplicationBreakdownsAddUpTheRuns():
+    params = dict(defaultParameters, seed = 3)
+    merged = replicationBreakdowns(params, 3, workers = 1, engine = 'lindley')
+    seeds = numpy.random.SeedSequence(3).spawn(3)
+    rows = sum(pandas.DataFrame(
+                 simulationRunner(dict(params, seed = seed), outputPath = None,
+                                  engine = 'lindley', breakdowns = True)
+                 ['breakdowns']['arrival'])['prescriptions'].sum()
+               for seed in seeds)
+    assert merged['arrival']['prescriptions'].sum() == rows
+    assert len(merged['replications']) == 3
@@ -0,0 +1,57 @@
+import numpy
+import pytest
+
+from dispensarySimulation.arrivalProfiles import ArrivalProfile
+from dispensarySimulation.parameters import defaultParameters
+from dispensarySimulation.randomStreams import BufferedStream
+from dispensarySimulation.runner import simulationRunner
+
+############################################################################
+###  Arrival profiles                                                    ###
+############################################################################
+
+#Rates peaking in the late morning of weekdays, none at night:
+def weekdayProfile():
+    rates = numpy.zeros(168)
+    for day in range(5):
+        rates[day * 24 + 9:day * 24 + 17] = [4, 6, 10, 8, 5, 5, 3, 2]
+    return rates
+
+def exponentialStream(seed):
+    return BufferedStream(numpy.random.default_rng(seed),
+                          'standard_exponential')
+
+def testTimesOfExpectedArrivalsInvertsExpectedArrivals():
+    profile = ArrivalProfile(weekdayProfile())
+    times = numpy.random.default_rng(1).uniform(0, 3 * 168, 1000)
+    times = times[profile.rates[(times % 168).astype(int)] > 0]
+    y = numpy.array([profile.expectedArrivals(t) for t in times.tolist()])
+    assert profile.timesOfExpectedArrivals(y) == pytest.approx(times)
+
+def testArrivalsPerHourFollowTheRates():
+    rates = weekdayProfile()
+    profile = ArrivalProfile(rates)
+    weeks = 200
+    arrivals = profile.arrivalsBetween(0, weeks * 168, exponentialStream(2))
+    assert (numpy.diff(arrivals) >= 0).all()
+    counts = numpy.bincount((arrivals % 168).astype(int), minlength = 168)
+    assert (counts[rates == 0] == 0).all()
+    expected = rates * weeks
+    #(Poisson counts, within four standard deviations)
+    assert (numpy.abs(counts - expected) <= 4 * numpy.sqrt(expected)).all()
+
+def testInvalidProfilesAreRejected():
+    with pytest.raises(ValueError):
+        ArrivalProfile(numpy.ones(24))
+    with pytest.raises(ValueError):
+        ArrivalProfile(numpy.full(168, -1.0))
+
+def testRunWithProfile():
+    rates = weekdayProfile()
+    results = simulationRunner(dict(defaultParameters, seed = 5,
+                                    arrivalProfile = rates.tolist()),
+                               outputPath = None, horizon = 168,
+                               keepRows = False)
+    #(the rates are all within opening hours, 9:00 to 17:30 on weekdays)
+    assert abs(results['totalWorkItems'] - rates.sum()) <= \
+           4 * numpy.sqrt(rates.sum())
@@ -0,0 +1,61 @@
+import dispensarySimulation.cache as cacheModule
+from dispensarySimulation.cache import ResultCache, cachedSimulationRunner
+from dispensarySimulation.parameters import defaultParameters
+
+############################################################################
+###  Cache of results                                                    ###
+############################################################################
+
+#Counting the simulation runs made behind the cache:
+def countRuns(monkeypatch):
+    runs = []
+    simulationRunner = cacheModule.simulationRunner
+    def countedRunner(*args, **kwargs):
+        runs.append(args[0])
+        return simulationRunner(*args, **kwargs)
+    monkeypatch.setattr(cacheModule, 'simulationRunner', countedRunner)
+    return runs
+
+def testSameDictionaryRunTwiceHitsTheCache(tmp_path, monkeypatch):
+    runs = countRuns(monkeypatch)
+    cache = ResultCache(tmp_path)
+    params = dict(defaultParameters, seed = 5)
+    first = dict(cachedSimulationRunner(params, cache, engine = 'lindley'))
+    #(params now holds the results of the first run as well)
+    second = dict(cachedSimulationRunner(params, cache, engine = 'lindley'))
+    third = cachedSimulationRunner(dict(defaultParameters, seed = 5), cache,
+                                   engine = 'lindley')
+    assert len(runs) == 1
+    for name in ['meanThroughput', 'meanWaiting', 'totalWorkItems',
+                 'completedWorkItems', 'percentageCompleted']:
+        assert second[name] == first[name] == third[name], name
+    entries = cache.connection.execute(
+                'SELECT key, bytes FROM entries').fetchall()
+    assert len(entries) == 1
+    assert entries[0][1] > 100
+    cache.close()
+
+def testOtherSeedOrOptionsMissTheCache(tmp_path, monkeypatch):
+    runs = countRuns(monkeypatch)
+    cache = ResultCache(tmp_path)
+    cachedSimulationRunner(dict(defaultParameters, seed = 5), cache,
+                           engine = 'lindley')
+    cachedSimulationRunner(dict(defaultParameters, seed = 6), cache,
+                           engine = 'lindley')
+    cachedSimulationRunner(dict(defaultParameters, seed = 5), cache,
+                           engine = 'lindley', horizon = 336)
+    assert len(runs) == 3
+    cache.close()
+
+def testEntryJustWrittenIsNotEvicted(tmp_path):
+    #(every entry is larger than the cache may be)
+    cache = ResultCache(tmp_path, maxBytes = 1)
+    for seed in [1, 2]:
+        results, tables = cachedSimulationRunner(
+                            dict(defaultParameters, seed = seed), cache,
+                            tables = True, engine = 'lindley')
+        assert len(tables['monitoring']) == results['totalWorkItems']
+        assert len(tables['pickups']) > 0
+    keys = cache.connection.execute('SELECT key FROM entries').fetchall()
+    assert len(keys) == 1
+    cache.close()
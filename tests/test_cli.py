@@ -0,0 +1,29 @@
+import json
+import pytest
+
+from dispensarySimulation.cli import main
+
+############################################################################
+###  Command line                                                        ###
+############################################################################
+
+def testSingleRunWritesCsvAndPrintsJson(tmp_path, capsys):
+    path = tmp_path / 'monitoring.csv'
+    assert main(['--seed', '1', '--horizon', '48', '--csv', str(path)]) == 0
+    results = json.loads(capsys.readouterr().out)
+    assert results['seed'] == 1
+    assert len(path.read_text().splitlines()) == results['totalWorkItems'] + 1
+
+@pytest.mark.parametrize('arguments',
+                         [['--replications', '2'],
+                          ['--precision', 'meanThroughput=0.1']])
+def testCsvOfReplicationsIsRejected(tmp_path, capsys, arguments):
+    with pytest.raises(SystemExit):
+        main(arguments + ['--csv', str(tmp_path / 'monitoring.csv')])
+    assert '--csv is for single runs' in capsys.readouterr().err
+    assert not (tmp_path / 'monitoring.csv').exists()
+
+def testAntitheticOfSingleRunIsRejected(capsys):
+    with pytest.raises(SystemExit):
+        main(['--antithetic'])
+    assert '--antithetic needs --replications' in capsys.readouterr().err
@@ -0,0 +1,53 @@
+import pandas
+import pytest
+
+from dispensarySimulation.columnarOutput import loadParquet
+from dispensarySimulation.parameters import defaultParameters
+from dispensarySimulation.runner import simulationRunner
+from dispensarySimulation.scenarios import scenarioKey
+
+############################################################################
+###  Columnar output                                                     ###
+############################################################################
+
+pytest.importorskip('pyarrow')
+
+def testMonitoringRoundTripEqualsCsv(tmp_path):
+    params = dict(defaultParameters, seed = 3)
+    csvPath = tmp_path / 'monitoringDf.csv'
+    simulationRunner(dict(params), outputPath = csvPath, horizon = 96,
+                     parquetRoot = tmp_path / 'parquet', replication = 0)
+    fromCsv = pandas.read_csv(csvPath, index_col = 0)
+    fromParquet = loadParquet(tmp_path / 'parquet')
+    assert list(fromParquet['prescription']) == list(fromCsv.index)
+    assert list(fromParquet['scenario']) == [scenarioKey(params)] * \
+                                             len(fromCsv)
+    assert isinstance(fromParquet['dayOfWeekOfArrival'].dtype,
+                      pandas.CategoricalDtype)
+    for column in ['arrivalTime', 'putInStore', 'throughputTime']:
+        assert fromParquet[column].tolist() == \
+               pytest.approx(fromCsv[column].tolist(), nan_ok = True)
+    assert list(fromParquet['dayOfWeekOfArrival'].astype(str)) == \
+           list(fromCsv['dayOfWeekOfArrival'])
+
+def testPartitionsAndColumnsAreSelected(tmp_path):
+    for numPharmacists in [2, 3]:
+        for replication in [0, 1]:
+            simulationRunner(dict(defaultParameters,
+                                  numPharmacists = numPharmacists,
+                                  seed = replication),
+                             outputPath = None, horizon = 48,
+                             engine = 'lindley', parquetRoot = tmp_path,
+                             replication = replication)
+    key = scenarioKey(dict(defaultParameters, numPharmacists = 3))
+    df = loadParquet(tmp_path, columns = ['arrivalTime'], scenarios = [key],
+                     replications = [1])
+    assert list(df.columns) == ['arrivalTime', 'scenario', 'replication']
+    assert set(df['scenario']) == {key}
+    assert set(df['replication']) == {1}
+    assert len(loadParquet(tmp_path, 'pickups')['replication']) > 0
+
+def testParquetNeedsTheReplication(tmp_path):
+    with pytest.raises(ValueError, match = 'replication'):
+        simulationRunner(dict(defaultParameters, seed = 1), outputPath = None,
+                         parquetRoot = tmp_path)
@@ -0,0 +1,35 @@
+import math
+import pytest
+import statistics
+
+from dispensarySimulation.confidence import confidenceInterval, tQuantile
+
+############################################################################
+###  Confidence intervals                                                ###
+############################################################################
+
+#Quantiles of Student's t-distribution, as in the usual tables:
+@pytest.mark.parametrize('probability, degreesOfFreedom, quantile',
+                         [(0.975, 1, 12.7062), (0.975, 2, 4.3027),
+                          (0.975, 3, 3.1824), (0.975, 4, 2.7764),
+                          (0.975, 5, 2.5706),
+                          (0.975, 10, 2.2281), (0.975, 30, 2.0423),
+                          (0.95, 4, 2.1318), (0.995, 20, 2.8453),
+                          (0.025, 8, -2.3060)])
+def testTQuantileAgainstTables(probability, degreesOfFreedom, quantile):
+    assert tQuantile(probability, degreesOfFreedom) == \
+           pytest.approx(quantile, rel = 2e-3)
+
+def testConfidenceInterval():
+    values = [4.0, 5.5, 6.0, 5.0, 4.5, float('nan')]
+    interval = confidenceInterval(values, 0.95)
+    assert interval['n'] == 5
+    assert interval['mean'] == 5.0
+    halfWidth = 2.7764 * statistics.stdev(values[:5]) / math.sqrt(5)
+    assert interval['halfWidth'] == pytest.approx(halfWidth, rel = 1e-3)
+    assert interval['lower'] == interval['mean'] - interval['halfWidth']
+
+def testIntervalOfFewValues():
+    assert math.isnan(confidenceInterval([3.0])['halfWidth'])
+    assert confidenceInterval([3.0])['mean'] == 3.0
+    assert math.isnan(confidenceInterval([])['mean'])
@@ -0,0 +1,42 @@
+import numpy
+import pytest
+
+from dispensarySimulation.parameters import defaultParameters
+from dispensarySimulation.runner import simulationRunner
+
+############################################################################
+###  Lindley engine                                                      ###
+############################################################################
+
+#Results which both engines report the same way:
+comparedResults = ['meanThroughput', 'meanWaiting', 'totalWorkItems',
+                   'completedWorkItems', 'percentageCompleted',
+                   'meanWaitingForVerif', 'meanWaitingForLabel',
+                   'meanWaitingForDisp', 'meanWaitingForFinCheck',
+                   'meanWaitingForTransp']
+
+#A trace with arrivals around the clock (also at night and at weekends) and
+#the durations of the steps, as a .npy file:
+@pytest.fixture
+def tracePath(tmp_path):
+    rng = numpy.random.default_rng(3)
+    arrivalTimes = numpy.sort(rng.uniform(0, 160, 1500))
+    durations = rng.exponential(0.25, (1500, 4))
+    path = tmp_path / 'trace.npy'
+    numpy.save(path, numpy.column_stack((arrivalTimes, durations)))
+    return path
+
+@pytest.mark.parametrize('keepRows', [True, False])
+def testEnginesAgreeOnTrace(tracePath, keepRows):
+    results = {engine: simulationRunner(dict(defaultParameters, seed = 1),
+                                        outputPath = None, engine = engine,
+                                        keepRows = keepRows,
+                                        trace = tracePath)
+               for engine in ['simpy', 'lindley']}
+    for name in comparedResults:
+        assert results['simpy'][name] == results['lindley'][name], name
+
+def testUnknownEngine():
+    with pytest.raises(ValueError, match = 'Unknown engine'):
+        simulationRunner(dict(defaultParameters, seed = 1), outputPath = None,
+                         engine = 'numba')
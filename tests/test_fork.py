@@ -0,0 +1,41 @@
+import math
+import pytest
+
+from dispensarySimulation.fork import forkRuns
+from dispensarySimulation.parameters import defaultParameters
+from dispensarySimulation.runner import simulationRunner
+
+############################################################################
+###  Checkpoint and fork                                                 ###
+############################################################################
+
+#Results which a forked run reports the same way as an unforked one:
+comparedResults = ['meanThroughput', 'meanWaiting', 'totalWorkItems',
+                   'completedWorkItems', 'percentageCompleted',
+                   'meanWaitingForVerif', 'meanWaitingForLabel',
+                   'meanWaitingForDisp', 'meanWaitingForFinCheck',
+                   'meanWaitingForTransp']
+
+params = dict(defaultParameters, seed = 7)
+
+def testForkWithEmptyVariantEqualsUnforkedRun():
+    unforked = simulationRunner(dict(params), outputPath = None)
+    forked = forkRuns(dict(params), 48, [{}], workers = 1)[0]
+    assert forked['forkTime'] == 48
+    for name in comparedResults:
+        if isinstance(unforked[name], float) and math.isnan(unforked[name]):
+            assert math.isnan(forked[name]), name
+        else:
+            assert forked[name] == unforked[name], name
+    assert forked['stages'] == unforked['stages']
+
+def testVariantsKeepTheirOrderAndParameters():
+    variants = [{'numPharmacists': n} for n in [4, 2, 3]]
+    results = forkRuns(dict(params), 48, variants, workers = 2)
+    assert [r['numPharmacists'] for r in results] == [4, 2, 3]
+    #(the arrivals before and after the fork are the same for all variants)
+    assert len({r['totalWorkItems'] for r in results}) == 1
+
+def testVariantCannotChangeTheCalendar():
+    with pytest.raises(ValueError, match = 'cannot be changed'):
+        forkRuns(dict(params), 48, [{'openingHours': {}}], workers = 1)
@@ -0,0 +1,35 @@
+import pytest
+
+from dispensarySimulation.cli import main
+from dispensarySimulation.live import StopSimulation
+from dispensarySimulation.parameters import defaultParameters
+from dispensarySimulation.runner import simulationRunner
+
+############################################################################
+###  Live KPIs                                                           ###
+############################################################################
+
+def testObserverIsCalledEveryInterval():
+    calls = []
+    simulationRunner(dict(defaultParameters, seed = 1), outputPath = None,
+                     horizon = 72, observer = calls.append,
+                     observeInterval = 12)
+    assert [kpis['time'] for kpis in calls] == [12, 24, 36, 48, 60]
+    assert calls[-1]['arrivals'] >= calls[0]['arrivals']
+
+def testObserverStopsTheRun():
+    def observer(kpis):
+        if kpis['time'] >= 48:
+            raise StopSimulation()
+    results = simulationRunner(dict(defaultParameters, seed = 1),
+                               outputPath = None, observer = observer)
+    assert results['stoppedAt'] == 48
+
+@pytest.mark.parametrize('interval', [0, -24])
+def testIntervalMustBePositive(interval, capsys):
+    with pytest.raises(ValueError):
+        simulationRunner(dict(defaultParameters, seed = 1), outputPath = None,
+                         observer = print, observeInterval = interval)
+    with pytest.raises(SystemExit):
+        main(['--live', '0', '--live-interval', str(interval)])
+    assert 'positive' in capsys.readouterr().err
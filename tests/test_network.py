@@ -0,0 +1,46 @@
+import numpy
+import pytest
+
+from dispensarySimulation.network import networkRuns, sharedTransport
+from dispensarySimulation.parameters import defaultParameters
+from dispensarySimulation.runner import simulationRunner
+
+############################################################################
+###  Networks of dispensaries                                            ###
+############################################################################
+
+@pytest.mark.parametrize('engine', ['simpy', 'lindley'])
+def testSingleSiteEqualsRunOfTheSite(engine):
+    params = dict(defaultParameters, seed = 4)
+    network = networkRuns([dict(params)], numDrivers = 6, engine = engine,
+                          workers = 1)
+    alone = simulationRunner(dict(params), outputPath = None, engine = engine)
+    for name in ['meanThroughput', 'meanWaiting', 'totalWorkItems',
+                 'completedWorkItems']:
+        assert network['sites'][0][name] == alone[name], name
+    assert network['transport']['meanDriverDelay'] == 0
+
+def testOneDriverServesOnePickupAtATime():
+    sites = [dict(defaultParameters, seed = seed,
+                  averageTranspDur = 1.5) for seed in range(4)]
+    pickups, transport = sharedTransport(sites, 1, 168)
+    trips = sorted(trip for site in pickups for trip in site)
+    for (time, duration), (nextTime, nextDuration) in zip(trips, trips[1:]):
+        assert nextTime >= time + duration - 1e-9
+    assert transport['pickups'] == len(trips)
+    assert transport['meanDriverDelay'] > 0
+    #(more drivers never make pick-ups later)
+    morePickups = sharedTransport(sites, 3, 168)[0]
+    for site, moreSite in zip(pickups, morePickups):
+        n = min(len(site), len(moreSite))
+        assert all(numpy.array(moreSite)[:n, 0] <= numpy.array(site)[:n, 0])
+
+def testShardsGiveTheSameResults():
+    sites = [dict(defaultParameters, numDispensers = n) for n in [2, 3, 4]]
+    serial = networkRuns(sites, numDrivers = 2, seed = 1, workers = 1,
+                         engine = 'lindley')
+    sharded = networkRuns(sites, numDrivers = 2, seed = 1, workers = 2,
+                          engine = 'lindley')
+    assert serial['summary'] == sharded['summary']
+    assert serial['summary']['totalWorkItems'] == \
+           sum(site['totalWorkItems'] for site in serial['sites'])
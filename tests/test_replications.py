@@ -0,0 +1,35 @@
+from dispensarySimulation.parameters import defaultParameters
+from dispensarySimulation.replications import runReplications, runUntilPrecise
+
+############################################################################
+###  Replications                                                        ###
+############################################################################
+
+params = dict(defaultParameters, seed = 12)
+
+def testReplicationsAreReproducible():
+    first = runReplications(params, 3, workers = 1, engine = 'lindley')
+    second = runReplications(params, 3, workers = 1, engine = 'lindley')
+    assert first['summary'] == second['summary']
+    assert len({r['meanThroughput'] for r in first['replications']}) == 3
+
+def testRunUntilPreciseMeetsTheTarget():
+    result = runUntilPrecise(params, {'meanThroughput': 0.5},
+                             minReplications = 4, maxReplications = 100,
+                             workers = 1, engine = 'lindley')
+    halfWidth = result['summary']['meanThroughput']['halfWidth']
+    assert result['precise']
+    assert halfWidth <= 0.5
+    assert result['batches'][-1]['replications'] == len(result['replications'])
+    #(the first replications are those of runReplications)
+    n = result['batches'][0]['replications']
+    plain = runReplications(params, n, workers = 1, engine = 'lindley')
+    assert [r['meanThroughput'] for r in result['replications'][:n]] == \
+           [r['meanThroughput'] for r in plain['replications']]
+
+def testRunUntilPreciseStopsAtMaxReplications():
+    result = runUntilPrecise(params, {'meanThroughput': 1e-6},
+                             minReplications = 4, maxReplications = 10,
+                             workers = 1, engine = 'lindley')
+    assert not result['precise']
+    assert len(result['replications']) == 10
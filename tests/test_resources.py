@@ -0,0 +1,49 @@
+import math
+import pytest
+
+from dispensarySimulation.columnarOutput import loadParquet
+from dispensarySimulation.parameters import defaultParameters
+from dispensarySimulation.runner import simulationRunner
+
+############################################################################
+###  Utilization and queue lengths of the stages                         ###
+############################################################################
+
+pytest.importorskip('pyarrow')
+
+def testShiftsAndLevelsAreWrittenAsParquet(tmp_path):
+    results = simulationRunner(dict(defaultParameters, seed = 4,
+                                    numPharmacists = 3),
+                               outputPath = None, horizon = 336,
+                               parquetRoot = tmp_path, replication = 0)
+    shifts = loadParquet(tmp_path, 'shifts')
+    levels = loadParquet(tmp_path, 'levels')
+    #14 days with six stages and the store each:
+    assert len(shifts) == 14 * 6
+    assert set(shifts['stage']) == set(results['stages'])
+    pharmacists = shifts[shifts['stage'] == 'Pharmacists']
+    assert pharmacists['utilization'].between(0, 1).all()
+    assert pharmacists['maxQueueLength'].max() == \
+           results['stages']['Pharmacists']['maxQueueLength']
+    #one row per hour, with levels within the capacity:
+    assert len(levels) == 336
+    assert levels['PharmacistsBusy'].between(0, 3).all()
+
+def testShiftUtilizationAddsUpToTheRun(tmp_path):
+    results = simulationRunner(dict(defaultParameters, seed = 4),
+                               outputPath = None, horizon = 168,
+                               keepRows = False, parquetRoot = tmp_path,
+                               replication = 0)
+    shifts = loadParquet(tmp_path, 'shifts')
+    labellers = shifts[shifts['stage'] == 'Labellers']
+    #shifts of 8.5 hours on weekdays and 4 hours at weekends:
+    lengths = [8.5] * 5 + [4] * 2
+    overall = sum(u * length for u, length in
+                  zip(labellers['utilization'], lengths)) / sum(lengths)
+    assert overall == pytest.approx(
+             results['stages']['Labellers']['utilization'])
+
+def testNoOpenHoursGiveNan():
+    results = simulationRunner(dict(defaultParameters, seed = 4),
+                               outputPath = None, horizon = 5)
+    assert math.isnan(results['stages']['Pharmacists']['utilization'])
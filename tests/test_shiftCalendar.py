@@ -0,0 +1,73 @@
+import numpy
+import pytest
+import simpy
+
+from dispensarySimulation.dispensary import Dispensary
+from dispensarySimulation.parameters import defaultParameters
+
+############################################################################
+###  Calendar of opening hours                                           ###
+############################################################################
+
+def calendarOfDispensary():
+    return Dispensary(simpy.Environment(), dict(defaultParameters),
+                      keepRows = False).calendar
+
+#Finish time found by walking through the shifts one day at a time (for
+#positive durations):
+def walkedFinishTime(calendar, startTime, duration):
+    time = startTime
+    remaining = duration
+    day = int(startTime // 24)
+    while True:
+        weeks, weekday = divmod(day, len(calendar.namesOfWeekdays))
+        opening = weeks * calendar.hoursPerWeek + calendar.shiftStarts[weekday]
+        closing = weeks * calendar.hoursPerWeek + calendar.shiftEnds[weekday]
+        time = max(time, opening)
+        if time < closing:
+            if remaining <= closing - time:
+                return time + remaining
+            remaining -= closing - time
+        day += 1
+
+def testFinishTimeAgainstWalkingThroughShifts():
+    calendar = calendarOfDispensary()
+    rng = numpy.random.default_rng(1)
+    startTimes = rng.uniform(0, 3 * 168, 20000)
+    durations = numpy.concatenate((rng.exponential(0.25, 10000),
+                                   rng.exponential(20, 10000)))
+    for startTime, duration in zip(startTimes.tolist(), durations.tolist()):
+        assert calendar.finishTime(startTime, duration) == pytest.approx(
+                 walkedFinishTime(calendar, startTime, duration), abs = 1e-9)
+
+def testFinishTimeAtShiftBoundaries():
+    calendar = calendarOfDispensary()
+    #Monday 9:00 to 17:30, Saturday 9:00 to 13:00:
+    assert calendar.finishTime(9, 8.5) == 17.5
+    assert calendar.finishTime(9, 9) == 24 + 9.5
+    assert calendar.finishTime(3, 1) == 10
+    assert calendar.finishTime(4 * 24 + 17, 1) == 5 * 24 + 9.5
+    assert calendar.finishTime(5 * 24 + 13, 0.5) == 6 * 24 + 9.5
+
+def testArraysAgreeWithSingleTimes():
+    calendar = calendarOfDispensary()
+    times = numpy.random.default_rng(2).uniform(0, 3 * 168, 2000)
+    openHours = calendar.openHoursUntilArray(times)
+    assert openHours.tolist() == pytest.approx(
+             [calendar.openHoursUntil(t) for t in times.tolist()])
+    assert calendar.timeAfterOpenHoursArray(openHours).tolist() == \
+           pytest.approx([calendar.timeAfterOpenHours(h)
+                          for h in openHours.tolist()])
+
+def testStartTimeIsNextOpeningOutsideOpeningHours():
+    calendar = calendarOfDispensary()
+    assert calendar.startTime(10.25) == 10.25
+    #at night, at closing time and over the weekend:
+    assert calendar.startTime(2) == 9
+    assert calendar.startTime(17.5) == 24 + 9
+    assert calendar.startTime(5 * 24 + 13) == 6 * 24 + 9
+    assert calendar.startTime(6 * 24 + 20) == 168 + 9
+    times = numpy.random.default_rng(3).uniform(0, 2 * 168, 2000)
+    assert [calendar.startTime(t) for t in times.tolist()] == pytest.approx(
+             calendar.timeAfterOpenHoursArray(
+               calendar.openHoursUntilArray(times), atOpening = True))
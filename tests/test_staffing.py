@@ -0,0 +1,39 @@
+import dispensarySimulation.staffing as staffingModule
+from dispensarySimulation.parameters import defaultParameters
+from dispensarySimulation.staffing import optimiseStaffing
+
+############################################################################
+###  Staffing optimisation                                               ###
+############################################################################
+
+costs = {'numPharmacists': 60, 'numLabellers': 25, 'numDispensers': 25,
+         'numFinCheckers': 45}
+
+#An executor standing in for a pool of many workers (the batches are run
+#in this process, and their sizes are kept):
+class RecordingExecutor(object):
+  def __init__(self, workers):
+    self.batchSizes = []
+
+  def shutdown(self):
+      pass
+
+def testBatchesDoNotGrowWithTheWorkers(monkeypatch):
+    executors = []
+    def newExecutor(workers):
+        executors.append(RecordingExecutor(workers))
+        return executors[-1]
+    runBatch = staffingModule.runBatch
+    def recordedBatch(executor, candidate, seeds, runOptions, first):
+        executor.batchSizes.append(len(seeds))
+        return runBatch(None, candidate, seeds, runOptions, first)
+    monkeypatch.setattr(staffingModule.concurrent.futures,
+                        'ProcessPoolExecutor', newExecutor)
+    monkeypatch.setattr(staffingModule, 'runBatch', recordedBatch)
+    #(a limit which the first batch shows to be met)
+    result = optimiseStaffing(dict(defaultParameters, seed = 1), costs,
+                              maxThroughput = 1000, bounds = (4, 4),
+                              initialReplications = 2, maxReplications = 10,
+                              workers = 64, engine = 'lindley')
+    assert result['best']['replications'] == 2
+    assert executors[0].batchSizes == [2]
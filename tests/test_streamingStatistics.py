@@ -0,0 +1,86 @@
+import math
+import numpy
+import pandas
+import pytest
+
+from dispensarySimulation.confidence import confidenceInterval
+from dispensarySimulation.parameters import defaultParameters
+from dispensarySimulation.runner import simulationRunner
+from dispensarySimulation.streamingStatistics import RunningMoments, mser5
+from dispensarySimulation.streamingStatistics import steadyStateResults
+
+############################################################################
+###  Streaming statistics                                                ###
+############################################################################
+
+def testRunningMomentsOfChunksEqualNumpy():
+    rng = numpy.random.default_rng(5)
+    values = rng.lognormal(1, 1, 10000)
+    moments = RunningMoments()
+    for chunk in numpy.array_split(values, [1, 2, 500, 501, 7000]):
+        moments.addMany(chunk)
+    assert moments.n == len(values)
+    assert moments.mean == pytest.approx(values.mean(), rel = 1e-12)
+    assert moments.variance() == pytest.approx(values.var(ddof = 1),
+                                               rel = 1e-10)
+    assert (moments.min, moments.max) == (values.min(), values.max())
+
+def testStreamingResultsEqualDataFrame(tmp_path):
+    params = dict(defaultParameters, seed = 6)
+    path = tmp_path / 'monitoringDf.csv'
+    simulationRunner(dict(params), outputPath = path, horizon = 336)
+    df = pandas.read_csv(path)
+    streamed = simulationRunner(dict(params), outputPath = None,
+                                horizon = 336, keepRows = False)
+    assert streamed['totalWorkItems'] == len(df)
+    assert streamed['completedWorkItems'] == df['timeOfDelivery'].count()
+    assert streamed['meanThroughput'] == \
+           round(df['throughputTime'].mean(), 2)
+    assert streamed['stdThroughput'] == round(df['throughputTime'].std(), 2)
+    for name in ['Verif', 'Label', 'Disp', 'FinCheck', 'Transp']:
+        assert streamed['meanWaitingFor' + name] == \
+               round(df['waitingFor' + name].mean(), 2), name
+    #(the sketch is within 1% of the exact quantile)
+    assert streamed['throughputP90'] == pytest.approx(
+             df['throughputTime'].quantile(0.9), rel = 0.011)
+
+@pytest.mark.parametrize('keepRows', [True, False])
+def testRunWithoutPrescriptions(keepRows):
+    #(the dispensary first opens on Monday at 9:00)
+    results = simulationRunner(dict(defaultParameters, seed = 6),
+                               outputPath = None, horizon = 5,
+                               keepRows = keepRows)
+    assert results['totalWorkItems'] == 0
+    assert math.isnan(results['percentageCompleted'])
+
+def testMserDeletesTheTransient():
+    rng = numpy.random.default_rng(8)
+    transient = 5 + 20 * numpy.exp(-numpy.arange(60) / 10)
+    stationary = rng.normal(5, 0.5, 400)
+    series = numpy.concatenate((transient + rng.normal(0, 0.5, 60),
+                                stationary))
+    assert 20 <= mser5(series) <= 60
+    assert mser5(stationary) < 40
+    assert mser5([3.0]) == 0
+
+def testBatchMeansOfTheKeptSeries():
+    rng = numpy.random.default_rng(9)
+    series = numpy.concatenate((numpy.full(10, 50.0),
+                                rng.normal(5, 1, 1003)))
+    results = steadyStateResults(series, numBatches = 20)
+    deleted = results['warmupPrescriptions'] // 5
+    assert deleted == 10
+    kept = series[deleted:deleted + 1000].reshape(20, 50).mean(axis = 1)
+    interval = confidenceInterval(kept)
+    assert results['numBatches'] == 20
+    assert results['steadyStateThroughput'] == round(interval['mean'], 2)
+    assert results['steadyStateHalfWidth'] == round(interval['halfWidth'], 2)
+
+def testSteadyStateRun():
+    results = simulationRunner(dict(defaultParameters, seed = 6),
+                               outputPath = None, horizon = 4 * 168,
+                               keepRows = False, steadyState = True)
+    assert results['warmupPrescriptions'] % 5 == 0
+    assert results['warmupPrescriptions'] < results['completedWorkItems'] / 2
+    assert results['numBatches'] == 20
+    assert results['steadyStateHalfWidth'] > 0
@@ -0,0 +1,51 @@
+import pytest
+
+from dispensarySimulation.parameters import defaultParameters
+from dispensarySimulation.sweeps import SweepStore, runSweep
+
+############################################################################
+###  Scenario sweeps                                                     ###
+############################################################################
+
+scenarios = [dict(defaultParameters, numPharmacists = n) for n in [2, 3]]
+
+def storedResults(path):
+    store = SweepStore(path)
+    results = {key: store.results(key) for key in store.scenarios()}
+    store.close()
+    return results
+
+def testResumedSweepEqualsUninterruptedSweep(tmp_path):
+    runOptions = {'engine': 'lindley', 'horizon': 48}
+    #(interrupted after two of three replications)
+    runSweep(scenarios, 2, tmp_path / 'resumed.db', seed = 11, workers = 1,
+             **runOptions)
+    aggregated = runSweep(scenarios, 3, tmp_path / 'resumed.db', workers = 1,
+                          **runOptions)
+    runSweep(scenarios, 3, tmp_path / 'whole.db', seed = 11, workers = 1,
+             **runOptions)
+    assert [summary['replications'] for summary in aggregated] == [3, 3]
+    assert storedResults(tmp_path / 'resumed.db') == \
+           storedResults(tmp_path / 'whole.db')
+
+def testResumingWithOtherSeedOrOptionsFails(tmp_path):
+    path = tmp_path / 'sweep.db'
+    runSweep(scenarios[:1], 1, path, seed = 11, workers = 1,
+             engine = 'lindley', horizon = 48)
+    with pytest.raises(ValueError, match = 'seed'):
+        runSweep(scenarios[:1], 2, path, seed = 12, workers = 1,
+                 engine = 'lindley', horizon = 48)
+    with pytest.raises(ValueError, match = 'run options'):
+        runSweep(scenarios[:1], 2, path, seed = 11, workers = 1,
+                 engine = 'lindley', horizon = 96)
+
+def testSweepWithPathOption(tmp_path):
+    pytest.importorskip('pyarrow')
+    for replications in [1, 2]:
+        aggregated = runSweep(scenarios[:1], replications,
+                              tmp_path / 'sweep.db', seed = 11, workers = 1,
+                              engine = 'lindley', horizon = 48,
+                              parquetRoot = tmp_path / 'parquet')
+    assert aggregated[0]['replications'] == 2
+    assert len(list((tmp_path / 'parquet' / 'monitoring').glob(
+                      '*/replication=*'))) == 2
@@ -0,0 +1,61 @@
+import numpy
+import pandas
+import pytest
+
+from dispensarySimulation.parameters import defaultParameters
+from dispensarySimulation.runner import simulationRunner
+from dispensarySimulation.traces import convertTrace, traceChunks
+
+############################################################################
+###  Traces of arrivals                                                  ###
+############################################################################
+
+durationColumns = ['verifDuration', 'labelDuration', 'dispDuration',
+                   'finCheckDuration']
+
+#A .csv trace of a week, with arrival times in hours and the durations of
+#the steps:
+@pytest.fixture
+def csvTrace(tmp_path):
+    rng = numpy.random.default_rng(4)
+    df = pandas.DataFrame(rng.exponential(0.2, (800, 4)),
+                          columns = durationColumns)
+    df.insert(0, 'arrivalTime', numpy.sort(rng.uniform(0, 168, 800)))
+    path = tmp_path / 'trace.csv'
+    df.to_csv(path, index = False)
+    return path
+
+def testChunksMakeUpTheTrace(csvTrace):
+    whole = list(traceChunks(csvTrace))
+    chunks = list(traceChunks(csvTrace, chunkSize = 37))
+    assert len(whole) == 1 and len(chunks) == 22
+    assert (numpy.concatenate([c[0] for c in chunks]) == whole[0][0]).all()
+    assert (numpy.concatenate([c[1] for c in chunks]) == whole[0][1]).all()
+
+@pytest.mark.parametrize('engine', ['simpy', 'lindley'])
+def testCsvAndNpyTracesGiveTheSameRun(csvTrace, tmp_path, engine):
+    npyPath = tmp_path / 'trace.npy'
+    convertTrace(csvTrace, npyPath, chunkSize = 100)
+    results = [simulationRunner(dict(defaultParameters, seed = 1),
+                                outputPath = None, engine = engine,
+                                trace = path)
+               for path in [csvTrace, npyPath]]
+    assert results[0]['totalWorkItems'] == 800
+    for name in ['meanThroughput', 'meanWaiting', 'completedWorkItems']:
+        assert results[0][name] == results[1][name], name
+
+def testDatesAreCountedFromMonday(tmp_path):
+    path = tmp_path / 'dates.csv'
+    #(Wednesday 6 and Thursday 7 March 2024)
+    pandas.DataFrame({'arrivalTime': ['2024-03-06 09:30',
+                                      '2024-03-07 14:15']}).to_csv(
+      path, index = False)
+    times, durations = next(traceChunks(path))
+    assert times.tolist() == [2 * 24 + 9.5, 3 * 24 + 14.25]
+    assert durations is None
+
+def testUnsortedTraceIsRejected(tmp_path):
+    path = tmp_path / 'unsorted.npy'
+    numpy.save(path, numpy.array([1.0, 3.0, 2.0]))
+    with pytest.raises(ValueError, match = 'ascending'):
+        list(traceChunks(path))